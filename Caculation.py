@@ -1,128 +1,468 @@
+import os
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from collections import defaultdict
-
-# Load CSV
-df = pd.read_csv('cleaned_file.csv')
-
-# Clean numeric columns
-pos_cols = ['pp', 'start', 'quarter', 'half', 'three_quarter', 'str', 'fin', 'odds']
-for col in pos_cols:
-    df[col] = pd.to_numeric(df[col], errors='coerce')
-
-# Parse date column
-df['date'] = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
-
-def detect_speed_bias_closers(df):
-    results = []
-    for (track, date), group in df.groupby(['track_name', 'date']):
-        races = group.groupby('race_number')
-        lead_winners = 0
-        total_races = 0
-        closers_outperformed = []
-
-        for race_id, race in races:
-            if race.empty or race['fin'].isna().all():
-                continue
-
-            total_races += 1
-            winner = race.loc[race['fin'].idxmin()]
-            if winner['quarter'] == 1.0:
-                lead_winners += 1
-
-            for _, horse in race.iterrows():
-                if pd.notna(horse['quarter']) and pd.notna(horse['fin']):
-                    if horse['quarter'] >= horse['fin'] + 2:
-                        closers_outperformed.append(horse)
-
-        if total_races == 0:
-            continue
-
-        lead_win_pct = lead_winners / total_races
-        if lead_win_pct >= 0.7:
-            for horse in closers_outperformed:
-                results.append({
-                    'track_name': track,
-                    'date': date,
-                    'horse_name': horse['horse_name'],
-                    'fin': horse['fin'],
-                    'quarter': horse['quarter'],
-                    'comment': horse['comments']
-                })
-
-    return pd.DataFrame(results)
-
-
-def detect_post_bias_and_outperformers(df):
-    results = []
-    bias_days = []
-
-    for (track, date), group in df.groupby(['track_name', 'date']):
-        races = group.groupby('race_number')
-        total_wins = 0
-        inside_wins = 0
-        win_by_pp = defaultdict(int)
-
-        horses_by_race = {}
-
-        for race_id, race in races:
-            if race.empty or race['fin'].isna().all():
-                continue
-
-            total_wins += 1
-            winner = race.loc[race['fin'].idxmin()]
-            pp = winner['pp']
-            if pd.notna(pp):
-                win_by_pp[int(pp)] += 1
-                if int(pp) in [1, 2, 3]:
-                    inside_wins += 1
-
-            # Rank horses by odds
-            race = race.copy()
-            race['odds_rank'] = race['odds'].rank(method='min')
-            horses_by_race[race_id] = race
-
-        if total_wins == 0:
-            continue
-
-        inside_win_pct = inside_wins / total_wins
-
-        if inside_win_pct >= 0.6:
-            bias_type = 'inside'
-        elif inside_win_pct <= 0.1:
-            bias_type = 'outside'
-        else:
-            continue  # no strong bias
-
-        bias_days.append((track, date, bias_type))
-
-        for race_id, race in horses_by_race.items():
-            for _, horse in race.iterrows():
-                if pd.notna(horse['fin']) and pd.notna(horse['odds_rank']):
-                    if horse['odds_rank'] - horse['fin'] >= 2:
-                        is_inside = horse['pp'] in [1, 2, 3]
-                        if (bias_type == 'inside' and not is_inside) or \
-                           (bias_type == 'outside' and is_inside):
-                            results.append({
-                                'track_name': track,
-                                'date': date,
-                                'bias_type': bias_type,
-                                'horse_name': horse['horse_name'],
-                                'pp': horse['pp'],
-                                'fin': horse['fin'],
-                                'odds': horse['odds'],
-                                'odds_rank': horse['odds_rank'],
-                                'comment': horse['comments']
-                            })
-
-    return pd.DataFrame(results), bias_days
-
-speed_bias_closers = detect_speed_bias_closers(df)
-speed_bias_closers.to_csv('speed_bias_closers.csv', index=False)
-
-# Method 2:
-post_bias_outperformers, bias_days = detect_post_bias_and_outperformers(df)
-post_bias_outperformers.to_csv('post_bias_outperformers.csv', index=False)
-df = pd.DataFrame(bias_days)
-df.to_csv("bias_days.csv")
-print("Bias Days Detected:", bias_days)
+import pyarrow as pa
+
+from race_store import CLEAN_STORE, CLEAN_SCHEMA, has_races, read_races
+from rolling_bias import load_rolling_index, save_rolling_index
+
+DAY_KEYS = ['track_name', 'date']
+RACE_KEYS = ['track_name', 'date', 'race_number']
+INSIDE_POSTS = [1, 2, 3]
+
+# Bias rules, see bias_sweep.py for backtesting other values
+LEAD_WIN_PCT = 0.7        # share of races won by the quarter-mile leader
+INSIDE_BIAS_PCT = 0.6     # share of races won from INSIDE_POSTS
+OUTSIDE_BIAS_PCT = 0.1
+CLOSER_GAIN = 2           # positions gained from the quarter to the finish
+ODDS_RANK_GAIN = 2        # finished this many places better than odds rank
+
+# Persisted per-day aggregates, see update_bias_store
+BIAS_STORE_PATH = 'bias_store.pkl'
+BIAS_STORE_VERSION = 3
+CANDIDATE_COLS = ['track_name', 'date', 'race_number', 'day_row', 'horse_name',
+                  'pp', 'quarter', 'fin', 'odds', 'odds_rank', 'comments',
+                  'quarter_lengths', 'fin_lengths']
+
+# Columns the detectors and the bias store need
+GAIN_LENGTH_COLS = ['quarter_lengths', 'fin_lengths']
+ANALYSIS_COLS = ['horse_name', 'pp', 'quarter', 'fin', 'odds', 'comments'] + RACE_KEYS + GAIN_LENGTH_COLS
+
+# Compact in-memory types, see compact_races
+CATEGORY_COLS = ['track_name', 'horse_name', 'jockey', 'comments', 'last_raced']
+SMALL_INT_COLS = ['pp', 'start', 'quarter', 'half', 'three_quarter', 'str', 'fin', 'race_number']
+CSV_CHUNK_ROWS = 20_000  # The CSV parser's buffers grow with the rows it reads at a time
+
+def _read_csv_compact(path, chunk_rows=CSV_CHUNK_ROWS):
+    """The CSV's ANALYSIS_COLS, read a chunk at a time and shrunk as they come in.
+
+    Text columns keep only int32 codes into the distinct values seen so far,
+    so they never exist as one string per row; they become categoricals
+    with sorted categories at the end. Numbers are float32 (odds float64)
+    until compact_races picks their final types.
+    """
+    text_cols = [col for col in CATEGORY_COLS + ['date'] if col in ANALYSIS_COLS]
+    columns, seen, parts = None, {col: {} for col in text_cols}, {}
+    for chunk in pd.read_csv(path, usecols=lambda col: col in ANALYSIS_COLS,
+                             dtype={col: object for col in text_cols}, chunksize=chunk_rows):
+        columns = list(chunk.columns)
+        for col, values in chunk.items():
+            if col in seen:
+                codes, uniques = pd.factorize(values.to_numpy())
+                index = seen[col]
+                lookup = np.array([index.setdefault(value, len(index)) for value in uniques] + [-1], dtype=np.int32)
+                values = lookup[codes]  # NaN has code -1, the lookup's last entry
+            else:
+                values = pd.to_numeric(values, errors='coerce').to_numpy('float64' if col == 'odds' else 'float32')
+            parts.setdefault(col, []).append(values)
+    if columns is None:
+        return pd.read_csv(path, usecols=lambda col: col in ANALYSIS_COLS)
+
+    df = {}
+    for col in columns:
+        values = np.concatenate(parts.pop(col))
+        if col in seen:
+            categories = pd.Index(list(seen[col]))
+            order = categories.argsort()
+            rank = np.empty(len(order) + 1, dtype=np.int32)
+            rank[order], rank[-1] = np.arange(len(order)), -1
+            values = pd.Categorical.from_codes(rank[values], categories=categories[order])
+        df[col] = values
+    return pd.DataFrame(df, copy=False)
+
+def load_races(path):
+    # Prefer the typed Parquet store written by cleaning.py; text comes out as categoricals
+    if os.path.isdir(path):
+        df = read_races(path, CLEAN_SCHEMA, columns=ANALYSIS_COLS, strings_to_categorical=True)
+    else:
+        # Older CSVs have no lengths
+        df = _read_csv_compact(path)
+    return compact_races(df)
+
+def _with_lengths(df):
+    # Beaten lengths as float32, NaN for charts cleaned before they existed
+    for col in GAIN_LENGTH_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32') if col in df else np.float32('nan')
+    return df
+
+def coerce_races(df):
+    # Clean numeric columns
+    pos_cols = ['pp', 'start', 'quarter', 'half', 'three_quarter', 'str', 'fin', 'odds']
+    for col in pos_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Parse date column
+    df['date'] = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
+
+    # Race numbers come from file names as text when the CSV is skipped
+    df['race_number'] = pd.to_numeric(df['race_number'], errors='coerce')
+    return _with_lengths(df)
+
+def _small_ints(values):
+    """Nullable Int8 when every value is a whole number that fits, else float32.
+
+    Signed on purpose: position differences like quarter - fin go negative.
+    """
+    values = pd.to_numeric(values, errors='coerce')
+    numbers = values.dropna()
+    if ((numbers % 1 == 0) & (numbers >= -128) & (numbers <= 127)).all():
+        return values.astype('Int8')
+    return values.astype('float32')
+
+def _day_codes(dates):
+    """Dates as an ordered categorical, i.e. small codes into the sorted race days."""
+    if not isinstance(dates.dtype, pd.CategoricalDtype):
+        dates = dates.astype('category')
+    days = pd.to_datetime(dates.cat.categories, dayfirst=True, errors='coerce')
+    unique_days = pd.DatetimeIndex(days.dropna().unique()).sort_values()
+    lookup = unique_days.get_indexer(days)
+    codes = dates.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, lookup[codes], -1)
+    return pd.Categorical.from_codes(codes, categories=unique_days, ordered=True)
+
+def compact_races(df):
+    """Shrink a race frame in place of coerce_races.
+
+    Names become categoricals, positions nullable Int8, beaten lengths float32
+    and dates day codes. Odds stay float64 so the written odds keep their exact decimals.
+    The detectors give the same results on either form.
+    """
+    for col in CATEGORY_COLS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in SMALL_INT_COLS:
+        if col in df:
+            df[col] = _small_ints(df[col])
+    if 'odds' in df:
+        df['odds'] = pd.to_numeric(df['odds'], errors='coerce')
+    df['date'] = _day_codes(df['date'])
+    return _with_lengths(df)
+
+def report_memory(df):
+    """Print the deep memory use of every column."""
+    usage = df.memory_usage(deep=True, index=False)
+    for col, nbytes in usage.items():
+        print(f"  {col:<14} {nbytes / 2**20:8.2f} MB  {df[col].dtype}")
+    print(f"  {'total':<14} {usage.sum() / 2**20:8.2f} MB  ({len(df)} rows)")
+
+def _mask(values):
+    """Boolean NumPy mask from a comparison, missing values count as False."""
+    return values.to_numpy(dtype=bool, na_value=False)
+
+def _plain_keys(frame):
+    """Turn categorical day keys back into their plain dtypes."""
+    frame = frame.copy()
+    for col in DAY_KEYS:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(frame[col].cat.categories.dtype)
+    return frame
+
+def prepare_races(df):
+    """Sort rows race by race and tag each race's winner and odds ranks.
+
+    Rows keep their original order inside a race, so the winner is the first
+    horse with the lowest `fin`, exactly like `idxmin` picks it.
+    """
+    races = df.dropna(subset=RACE_KEYS)
+    races = races.sort_values(RACE_KEYS, kind='mergesort')
+
+    race_groups = races.groupby(RACE_KEYS, sort=False, observed=True)
+    best_fin = race_groups['fin'].transform('min')
+    is_best = _mask(races['fin'].eq(best_fin))
+    race_id = race_groups.ngroup().to_numpy()
+
+    # First best-finishing row of every race that has a result
+    first_best = np.zeros(len(races), dtype=bool)
+    best_pos = np.flatnonzero(is_best)
+    _, first = np.unique(race_id[best_pos], return_index=True)
+    first_best[best_pos[first]] = True
+
+    races = races.assign(
+        is_winner=first_best,
+        odds_rank=race_groups['odds'].rank(method='min'),
+        day_row=races.groupby(DAY_KEYS, sort=False, observed=True).cumcount(),
+    )
+    return races
+
+def compute_day_stats(races):
+    """Aggregate winners into per-(track, date) counts."""
+    winners = races[races['is_winner']]
+    winner_pp = winners['pp'].to_numpy(dtype=float, na_value=np.nan)
+    stats = pd.DataFrame({
+        'track_name': winners['track_name'],
+        'date': winners['date'],
+        'races': 1,
+        'lead_winners': _mask(winners['quarter'].eq(1.0)).astype(int),
+        'inside_winners': np.isin(np.trunc(winner_pp), INSIDE_POSTS).astype(int),
+        'closer_winners': _mask(winners['quarter'] >= 1 + CLOSER_GAIN).astype(int),
+    })
+    return stats.groupby(DAY_KEYS, sort=False, as_index=False, observed=True).sum()
+
+def compute_wins_by_pp(races):
+    """Count race wins per post position for every (track, date)."""
+    winners = races[races['is_winner'] & races['pp'].notna()]
+    wins = winners.groupby(DAY_KEYS + ['pp'], sort=False, observed=True).size()
+    return wins.rename('wins').reset_index()
+
+def _flag_days(races, days):
+    """Broadcast per-day flags back onto the race rows."""
+    keys = races[DAY_KEYS]
+    if any(keys[col].dtype != days[col].dtype for col in DAY_KEYS):
+        keys, days = _plain_keys(keys), _plain_keys(days)
+    return keys.merge(days, on=DAY_KEYS, how='left')
+
+def _speed_bias_closer_rows(df, races=None, day_stats=None):
+    if races is None:
+        races = prepare_races(df)
+    if day_stats is None:
+        day_stats = compute_day_stats(races)
+
+    speed_days = day_stats.loc[
+        day_stats['lead_winners'] / day_stats['races'] >= LEAD_WIN_PCT, DAY_KEYS
+    ].assign(speed_bias=True)
+    on_speed_day = _flag_days(races, speed_days)['speed_bias'].eq(True).to_numpy()
+
+    closer = _mask(races['quarter'] >= races['fin'] + CLOSER_GAIN)
+    return races[on_speed_day & closer]
+
+def _closer_frame(closers):
+    return pd.DataFrame({
+        'track_name': closers['track_name'],
+        'date': closers['date'],
+        'horse_name': closers['horse_name'],
+        'fin': closers['fin'].astype(float),
+        'quarter': closers['quarter'].astype(float),
+        'comment': closers['comments'],
+    }).reset_index(drop=True)
+
+def detect_speed_bias_closers(df, races=None, day_stats=None):
+    closers = _speed_bias_closer_rows(df, races, day_stats)
+    if closers.empty:
+        return pd.DataFrame()
+    return _closer_frame(closers)
+
+def rank_closers_by_lengths_gained(df, races=None, day_stats=None):
+    """The speed-bias closers, most lengths gained from the quarter to the finish first.
+
+    Charts cleaned without beaten lengths have NaN there and come last.
+    """
+    closers = _speed_bias_closer_rows(df, races, day_stats)
+    if closers.empty:
+        return pd.DataFrame()
+    lengths_gained = (closers['quarter_lengths'].astype(float) - closers['fin_lengths']).round(2)
+    ranked = _closer_frame(closers).assign(lengths_gained=lengths_gained.to_numpy())
+    return ranked.sort_values('lengths_gained', ascending=False, na_position='last',
+                              kind='mergesort').reset_index(drop=True)
+
+
+def detect_post_bias_and_outperformers(df, races=None, day_stats=None):
+    if races is None:
+        races = prepare_races(df)
+    if day_stats is None:
+        day_stats = compute_day_stats(races)
+
+    inside_win_pct = day_stats['inside_winners'] / day_stats['races']
+    # Inside wins when both thresholds hold, as the per-day loop did
+    bias_type = pd.Series(np.select([inside_win_pct >= INSIDE_BIAS_PCT, inside_win_pct <= OUTSIDE_BIAS_PCT],
+                                    ['inside', 'outside'], default=None), index=day_stats.index)
+    biased = day_stats.loc[bias_type.notna(), DAY_KEYS].assign(
+        bias_type=bias_type[bias_type.notna()])
+    bias_days = list(biased.itertuples(index=False, name=None))
+
+    race_bias = _flag_days(races, biased)['bias_type'].to_numpy()
+    is_inside = _mask(races['pp'].isin(INSIDE_POSTS))
+    outperformed = _mask(races['odds_rank'] - races['fin'] >= ODDS_RANK_GAIN)
+    against_bias = ((race_bias == 'inside') & ~is_inside) | \
+                   ((race_bias == 'outside') & is_inside)
+
+    horses = races[outperformed & against_bias]
+    if horses.empty:
+        return pd.DataFrame(), bias_days
+
+    results = pd.DataFrame({
+        'track_name': horses['track_name'],
+        'date': horses['date'],
+        'bias_type': race_bias[outperformed & against_bias],
+        'horse_name': horses['horse_name'],
+        'pp': horses['pp'],
+        'fin': horses['fin'].astype(float),
+        'odds': horses['odds'],
+        'odds_rank': horses['odds_rank'],
+        'comment': horses['comments'],
+    }).reset_index(drop=True)
+    return results, bias_days
+
+def compute_day_results(rows):
+    """Per-day stats, wins by post position and candidate horses for `rows`."""
+    races = prepare_races(rows)
+    is_candidate = (races['quarter'] >= races['fin'] + CLOSER_GAIN) | \
+                   (races['odds_rank'] - races['fin'] >= ODDS_RANK_GAIN)
+    return compute_day_stats(races), compute_wins_by_pp(races), races.loc[is_candidate, CANDIDATE_COLS]
+
+def _day_results_shard(path, start, stop):
+    # Memory-map the shared Arrow file and only materialise this track's rows
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all().slice(start, stop - start)
+        rows = table.to_pandas()
+    return compute_day_results(rows)
+
+def compute_day_results_parallel(rows, workers):
+    """Run compute_day_results across a process pool, one track per task.
+
+    Rows are handed over through a memory-mapped Arrow IPC file instead of
+    pickled DataFrames; shard results are merged in track order.
+    """
+    rows = rows.dropna(subset=RACE_KEYS).sort_values('track_name', kind='mergesort')
+    track = rows['track_name'].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, track[1:] != track[:-1], True])
+    if len(bounds) <= 2:
+        return compute_day_results(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'races.arrow')
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        del table
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shards = list(executor.map(_day_results_shard, [path] * (len(bounds) - 1),
+                                       bounds[:-1], bounds[1:]))
+
+    return tuple(pd.concat([part for part in parts if not part.empty] or parts[:1], ignore_index=True)
+                 for parts in zip(*shards))
+
+def fingerprint_days(df):
+    """Hash the source rows of every (track, date) in race order."""
+    rows = df.dropna(subset=RACE_KEYS).sort_values(RACE_KEYS, kind='mergesort')
+    if rows.empty:
+        return pd.DataFrame(columns=DAY_KEYS + ['fingerprint'])
+
+    row_hash = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    day_groups = rows.groupby(DAY_KEYS, sort=False, observed=True)
+    day_id = day_groups.ngroup().to_numpy()
+    day_row = day_groups.cumcount().to_numpy().astype(np.uint64)
+
+    # Mix in the row position so reordered rows (which can change the winner) count as a change
+    mixed = pd.util.hash_array(row_hash ^ (day_row * np.uint64(0x9E3779B97F4A7C15)))
+    starts = np.flatnonzero(np.r_[True, day_id[1:] != day_id[:-1]])
+
+    days = _plain_keys(rows.iloc[starts][DAY_KEYS]).reset_index(drop=True)
+    days['fingerprint'] = np.add.reduceat(mixed, starts)
+    return days
+
+def _in_days(frame, days):
+    keys = pd.MultiIndex.from_frame(frame[DAY_KEYS])
+    return keys.isin(pd.MultiIndex.from_frame(days[DAY_KEYS]))
+
+def _replace_days(old, new, days, order):
+    """Drop `days` from `old`, add the freshly computed rows and restore order."""
+    parts = [] if old is None else [old[~_in_days(old, days)]]
+    parts = [part for part in parts + [new] if not part.empty]
+    if not parts:
+        return new
+    merged = pd.concat(parts, ignore_index=True)
+    return merged.sort_values(order, kind='mergesort').reset_index(drop=True)
+
+def load_bias_store(path=BIAS_STORE_PATH):
+    if not os.path.exists(path):
+        return None
+    store = pd.read_pickle(path)
+    if store.get('version') != BIAS_STORE_VERSION or \
+            store.get('candidate_rules') != (CLOSER_GAIN, ODDS_RANK_GAIN):
+        print(f"⚠️ Ignoring outdated bias store at {path}")
+        return None
+    return store
+
+def save_bias_store(store, path=BIAS_STORE_PATH):
+    pd.to_pickle(store, path)
+
+def update_bias_store(df, store=None, workers=1):
+    """Recompute only the (track, date) groups that are new or changed.
+
+    Days that are in the store but not in `df` are kept, so `df` may hold
+    just the latest charts. Returns the updated store and the recomputed days.
+    """
+    fingerprints = fingerprint_days(df)
+    if store is None:
+        dirty = fingerprints[DAY_KEYS]
+    else:
+        known = fingerprints.merge(store['fingerprints'], on=DAY_KEYS,
+                                   how='left', suffixes=('', '_stored'))
+        dirty = known.loc[known['fingerprint'] != known['fingerprint_stored'], DAY_KEYS]
+
+    rows = df[_in_days(df, dirty)]
+    if workers > 1:
+        day_stats, wins_by_pp, candidates = compute_day_results_parallel(rows, workers)
+    else:
+        day_stats, wins_by_pp, candidates = compute_day_results(rows)
+    # The store keeps plain keys so days from differently encoded runs line up
+    day_stats, wins_by_pp, candidates = map(_plain_keys, (day_stats, wins_by_pp, candidates))
+
+    def stored(name):
+        return None if store is None else store[name]
+
+    store = {
+        'version': BIAS_STORE_VERSION,
+        'candidate_rules': (CLOSER_GAIN, ODDS_RANK_GAIN),
+        'fingerprints': _replace_days(stored('fingerprints'), fingerprints[_in_days(fingerprints, dirty)], dirty, DAY_KEYS),
+        'day_stats': _replace_days(stored('day_stats'), day_stats, dirty, DAY_KEYS),
+        'wins_by_pp': _replace_days(stored('wins_by_pp'), wins_by_pp, dirty, DAY_KEYS + ['pp']),
+        'candidates': _replace_days(stored('candidates'), candidates, dirty, DAY_KEYS + ['day_row']),
+    }
+    return store, dirty
+
+def run_bias_detection(df, store=None, workers=1):
+    """Update `store` with `df` and run both detectors on the result.
+
+    Returns the updated store, the recomputed days, the speed-bias closers,
+    the post-bias outperformers and the bias days. Nothing is written to disk.
+    """
+    store, dirty = update_bias_store(df, store, workers=workers)
+
+    # Stored candidates already hold every horse either detector can flag
+    candidates, day_stats = store['candidates'], store['day_stats']
+    speed_bias_closers = detect_speed_bias_closers(df, candidates, day_stats)
+
+    # Method 2:
+    post_bias_outperformers, bias_days = detect_post_bias_and_outperformers(df, candidates, day_stats)
+    return store, dirty, speed_bias_closers, post_bias_outperformers, bias_days
+
+def save_bias_outputs(store, dirty, speed_bias_closers, post_bias_outperformers, bias_days):
+    save_bias_store(store)
+
+    # Roll the recomputed days into the per-track 3/7/20 day bias index;
+    # a new or deleted index is seeded from every stored day
+    day_stats = store['day_stats']
+    rolling = load_rolling_index()
+    rolling.add_day_stats(day_stats if not rolling.days else day_stats[_in_days(day_stats, dirty)])
+    save_rolling_index(rolling)
+    rolling.to_frame().to_csv('rolling_bias_index.csv', index=False)
+
+    speed_bias_closers.to_csv('speed_bias_closers.csv', index=False)
+    rank_closers_by_lengths_gained(None, store['candidates'], day_stats).to_csv(
+        'closers_by_lengths_gained.csv', index=False)
+    post_bias_outperformers.to_csv('post_bias_outperformers.csv', index=False)
+    pd.DataFrame(bias_days).to_csv("bias_days.csv")
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect track bias days and the horses that ran against them.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes to shard the bias computation across by track (default: 1, serial)")
+    args = parser.parse_args()
+
+    df = load_races(CLEAN_STORE if has_races(CLEAN_STORE) else 'cleaned_file.csv')
+    print("Race frame memory:")
+    report_memory(df)
+    results = run_bias_detection(df, load_bias_store(), workers=args.workers)
+    save_bias_outputs(*results)
+
+    store, dirty, _, _, bias_days = results
+    print(f"Recomputed {len(dirty)} of {len(store['fingerprints'])} track days")
+    print("Bias Days Detected:", bias_days)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from synthetic_races import generate_race_rows
+from cleaning import extract_first_valid_int, extract_first_int_pp, cols_to_clean, clean_races
+from Caculation import coerce_races, detect_speed_bias_closers, detect_post_bias_and_outperformers
+from getting_today_bias_horse import fuzzy_match_horses
+from horse_index import HorseIndex
+from run_results import append_run, git_commit, load_runs
+
+RESULTS_FILE = "bench_results.json"
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# The fuzzy matcher is quadratic, so it runs on a capped slice of each size
+FUZZY_MAX_BIAS_ROWS = 50
+FUZZY_MAX_CARD_ROWS = 1_000
+
+def measure(name, rows, fn, memory=True):
+    """Time one call of `fn`, then trace a second call for its peak allocation."""
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    result = {'name': name, 'rows': rows, 'seconds': round(seconds, 4),
+              'peak_mb': None if peak_mb is None else round(peak_mb, 2)}
+    print(f"  {name:<36} {rows:>10,} rows  {seconds:9.3f} s"
+          + ("" if peak_mb is None else f"  {peak_mb:9.1f} MB"))
+    return result
+
+def bench_size(rows, seed, memory):
+    raw = generate_race_rows(rows, seed=seed)
+    clean = coerce_races(generate_race_rows(rows, seed=seed, raw=False))
+
+    def clean_positions():
+        for col in cols_to_clean:
+            raw[col].apply(extract_first_valid_int)
+
+    bias_results = []
+
+    def post_bias():
+        bias_results[:] = [detect_post_bias_and_outperformers(clean)[0]]
+
+    results = [
+        measure('extract_first_valid_int', rows * len(cols_to_clean), clean_positions, memory),
+        measure('extract_first_int_pp', rows, lambda: raw['pp'].apply(extract_first_int_pp), memory),
+        measure('clean_races', rows, lambda: clean_races(raw), memory),
+        measure('detect_speed_bias_closers', rows, lambda: detect_speed_bias_closers(clean), memory),
+        measure('detect_post_bias_and_outperformers', rows, post_bias, memory),
+    ]
+
+    # Today's card: horses from the charts, as the equibase scrape names them
+    rng = np.random.default_rng(seed)
+    bias_rows = bias_results[0].head(FUZZY_MAX_BIAS_ROWS)
+    card_names = rng.choice(clean['horse_name'].unique(), size=min(FUZZY_MAX_CARD_ROWS, rows // 10))
+    card = pd.DataFrame({'Horse': card_names, 'Track': 'Saratoga'})
+    results.append(measure('fuzzy_match_horses', len(bias_rows) * len(card),
+                           lambda: fuzzy_match_horses(bias_rows.copy(), card.copy()), memory))
+
+    horses = HorseIndex()
+    results.append(measure('horse_index_build', rows, lambda: HorseIndex().add_races(clean), memory))
+    horses.add_races(clean)
+    results.append(measure('horse_recent_form', len(card), lambda: horses.recent_form(card['Horse']), memory))
+    return results
+
+def compare_with_previous(run, runs):
+    """Print the time ratio against the last recorded run."""
+    if not runs:
+        return
+    previous = {(r['name'], r['rows']): r for r in runs[-1]['results']}
+    print(f"\nCompared with {runs[-1]['commit']} ({runs[-1]['timestamp']}):")
+    for r in run['results']:
+        before = previous.get((r['name'], r['rows']))
+        if before and before['seconds']:
+            print(f"  {r['name']:<36} {r['rows']:>10,} rows  x{r['seconds'] / before['seconds']:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cleaning and bias stages on synthetic charts.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="synthetic row counts to run, e.g. 10000 1000000 10000000")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--output', default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    run = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'results': [],
+    }
+    for rows in args.sizes:
+        print(f"\n📊 {rows:,} synthetic rows")
+        run['results'] += bench_size(rows, args.seed, memory=not args.no_memory)
+
+    runs = load_runs(args.output)
+    compare_with_previous(run, runs)
+    append_run(args.output, run, runs)
+
+if __name__ == "__main__":
+    main()
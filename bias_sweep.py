@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from Caculation import (DAY_KEYS, INSIDE_POSTS, LEAD_WIN_PCT, INSIDE_BIAS_PCT,
+                        OUTSIDE_BIAS_PCT, CLOSER_GAIN, ODDS_RANK_GAIN, _flag_days,
+                        load_races, prepare_races, compute_day_stats)
+from race_store import CLEAN_STORE, has_races
+
+# Threshold grids to backtest, each one contains the value Caculation.py uses
+LEAD_WIN_GRID = np.round(np.arange(0.50, 0.951, 0.05), 2)
+CLOSER_GAIN_GRID = np.arange(1, 6)
+INSIDE_BIAS_GRID = np.round(np.arange(0.40, 0.851, 0.05), 2)
+OUTSIDE_BIAS_GRID = np.round(np.arange(0.00, 0.301, 0.05), 2)
+ODDS_RANK_GAIN_GRID = np.arange(1, 6)
+
+CHUNK_ROWS = 50_000  # horses scored per block, bounds the horses x combinations matrix
+
+def add_next_start(races):
+    """Attach every horse's finish in its next start (NaN when it has not run again)."""
+    keyed = races.assign(horse=races['horse_name'].str.strip().str.lower())
+    keyed = keyed.sort_values(['horse', 'date', 'race_number'], kind='mergesort')
+    by_horse = keyed.groupby('horse', sort=False)
+    next_fin = by_horse['fin'].shift(-1).where(by_horse['date'].shift(-1) > keyed['date'])
+    return races.assign(next_fin=next_fin.reindex(races.index))
+
+def _outcomes(horses):
+    """Columns summed per combination: flagged, next starts, next wins, next finish total."""
+    next_fin = horses['next_fin'].to_numpy(dtype=float, na_value=np.nan)
+    has_next = ~np.isnan(next_fin)
+    return np.column_stack([
+        np.ones(len(horses)),
+        has_next,
+        next_fin == 1,
+        np.where(has_next, next_fin, 0.0),
+    ])
+
+def _score(day_flags, day_idx, horse_flags, outcomes):
+    """Sum outcomes over the horses each combination flags, in bounded chunks."""
+    totals = np.zeros((day_flags.shape[1], outcomes.shape[1]))
+    for start in range(0, len(day_idx), CHUNK_ROWS):
+        block = slice(start, start + CHUNK_ROWS)
+        flags = horse_flags(day_flags[day_idx[block]], block)
+        totals += flags.T.astype(float) @ outcomes[block]
+    return totals
+
+def _report(grid, totals):
+    report = pd.DataFrame(grid)
+    report['flagged'] = totals[:, 0].astype(int)
+    report['next_starts'] = totals[:, 1].astype(int)
+    report['next_wins'] = totals[:, 2].astype(int)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        report['next_win_pct'] = totals[:, 2] / totals[:, 1]
+        report['next_avg_fin'] = totals[:, 3] / totals[:, 1]
+    return report
+
+def _day_index(races, day_stats):
+    days = day_stats[DAY_KEYS].assign(day_idx=np.arange(len(day_stats)))
+    return _flag_days(races, days)['day_idx'].to_numpy()
+
+def sweep_speed_bias(races, day_stats, lead_grid=LEAD_WIN_GRID, gain_grid=CLOSER_GAIN_GRID):
+    """Backtest every (lead-win %, closer gain) pair of the speed-bias rule."""
+    lead, gain = (a.ravel() for a in np.meshgrid(lead_grid, gain_grid, indexing='ij'))
+    lead_pct = (day_stats['lead_winners'] / day_stats['races']).to_numpy()
+    day_flags = lead_pct[:, None] >= lead[None, :]
+
+    closer_gain = (races['quarter'] - races['fin']).to_numpy(dtype=float, na_value=np.nan)
+    day_idx = _day_index(races, day_stats)
+    keep = ~np.isnan(day_idx) & (closer_gain >= gain.min())
+    horses, closer_gain, day_idx = races[keep], closer_gain[keep], day_idx[keep].astype(int)
+
+    def horse_flags(on_day, block):
+        return on_day & (closer_gain[block, None] >= gain[None, :])
+
+    report = _report({'lead_win_pct': lead, 'closer_gain': gain},
+                     _score(day_flags, day_idx, horse_flags, _outcomes(horses)))
+    report.insert(2, 'bias_days', day_flags.sum(axis=0))
+    return report
+
+def sweep_post_bias(races, day_stats, inside_grid=INSIDE_BIAS_GRID,
+                    outside_grid=OUTSIDE_BIAS_GRID, gain_grid=ODDS_RANK_GAIN_GRID):
+    """Backtest every (inside %, outside %, odds-rank gain) triple of the post-bias rule."""
+    inside, outside, gain = (a.ravel() for a in np.meshgrid(inside_grid, outside_grid, gain_grid,
+                                                            indexing='ij'))
+    inside_pct = (day_stats['inside_winners'] / day_stats['races']).to_numpy()
+    inside_days = inside_pct[:, None] >= inside[None, :]
+    outside_days = ~inside_days & (inside_pct[:, None] <= outside[None, :])
+    # One matrix holds both: +1 inside bias day, -1 outside bias day, 0 none
+    day_flags = inside_days.astype(np.int8) - outside_days.astype(np.int8)
+
+    odds_gain = (races['odds_rank'] - races['fin']).to_numpy(dtype=float, na_value=np.nan)
+    day_idx = _day_index(races, day_stats)
+    keep = ~np.isnan(day_idx) & (odds_gain >= gain.min())
+    horses, odds_gain, day_idx = races[keep], odds_gain[keep], day_idx[keep].astype(int)
+    # +1 for horses that are off the rail, -1 for the inside posts
+    side = np.where(horses['pp'].isin(INSIDE_POSTS).to_numpy(dtype=bool), -1, 1).astype(np.int8)
+
+    def horse_flags(bias, block):
+        return (bias == side[block, None]) & (odds_gain[block, None] >= gain[None, :])
+
+    report = _report({'inside_bias_pct': inside, 'outside_bias_pct': outside, 'odds_rank_gain': gain},
+                     _score(day_flags, day_idx, horse_flags, _outcomes(horses)))
+    report.insert(3, 'inside_days', inside_days.sum(axis=0))
+    report.insert(4, 'outside_days', outside_days.sum(axis=0))
+    return report
+
+def main():
+    df = load_races(CLEAN_STORE if has_races(CLEAN_STORE) else 'cleaned_file.csv')
+
+    # Sufficient statistics are computed once and shared by every combination
+    races = add_next_start(prepare_races(df))
+    day_stats = compute_day_stats(races)
+
+    speed = sweep_speed_bias(races, day_stats)
+    speed.to_csv('bias_sweep_speed.csv', index=False)
+    post = sweep_post_bias(races, day_stats)
+    post.to_csv('bias_sweep_post.csv', index=False)
+    print(f"✅ Backtested {len(speed)} speed-bias and {len(post)} post-bias combinations")
+
+    current = speed[(speed['lead_win_pct'] == LEAD_WIN_PCT) & (speed['closer_gain'] == CLOSER_GAIN)]
+    print("\nSpeed bias, current rule:\n", current.to_string(index=False))
+    print("\nSpeed bias, best next-out win % (≥ 20 next starts):\n",
+          speed[speed['next_starts'] >= 20].nlargest(5, 'next_win_pct').to_string(index=False))
+
+    current = post[(post['inside_bias_pct'] == INSIDE_BIAS_PCT) & (post['outside_bias_pct'] == OUTSIDE_BIAS_PCT)
+                   & (post['odds_rank_gain'] == ODDS_RANK_GAIN)]
+    print("\nPost bias, current rule:\n", current.to_string(index=False))
+    print("\nPost bias, best next-out win % (≥ 20 next starts):\n",
+          post[post['next_starts'] >= 20].nlargest(5, 'next_win_pct').to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
-import pandas as pd
+import argparse
+import json
+import os
 import re
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from race_store import (RAW_STORE, RAW_SCHEMA, CLEAN_STORE, CLEAN_SCHEMA, drop_days, has_races, race_days,
+                        read_races, iter_races, write_races, write_race_chunks, to_clean_frame)
+from horse_index import load_horse_index, save_horse_index
 
 # Translation map to convert superscript digits to normal digits
 SUPERSCRIPT_MAP = str.maketrans({
@@ -45,26 +57,359 @@ def extract_first_int_pp(text):
             return n
     return None
 
-# Load the CSV file
-df = pd.read_excel("combined_race_data.xlsx")  # Replace with your actual filename
+# Same rules as the two functions above, as patterns for pandas string methods:
+# split superscripts from a preceding digit, then take the first digit run worth 1-15
+SUPERSCRIPT_AFTER_DIGIT = r'(?<=[0-9])([⁰¹²³⁴⁵⁶⁷⁸⁹])'
+FIRST_VALID_INT = r'(?<!\d)0*(1[0-5]|[1-9])(?!\d)'
+
+# Lengths written after a position, e.g. "4³ ¹/²" is 3 1/2 lengths clear of the next horse
+SUPERSCRIPTS = '[⁰¹²³⁴⁵⁶⁷⁸⁹]'
+MARGIN = (rf'^\s*\d+\s*(?P<whole>{SUPERSCRIPTS}+(?!{SUPERSCRIPTS}*[/⁄]))?\s*'
+          rf'(?:(?P<num>{SUPERSCRIPTS}+)[/⁄](?P<den>{SUPERSCRIPTS}+))?\s*(?P<short>ʰᵈ|ⁿᵏ|ⁿᵒ)?')
+SHORT_MARGINS = {'ⁿᵒ': 0.05, 'ʰᵈ': 0.1, 'ⁿᵏ': 0.25}
+RACE_KEYS = ['track_name', 'date', 'race_number']
+
+CLEANED_CSV = "cleaned_file.csv"
+CLEAN_CHUNK_ROWS = 100_000
+
+PARSE_CACHE_PATH = 'parse_cache.pkl'
+PARSE_CACHE_SIZE = 100_000
+
+def _parse_texts(text, superscripts):
+    if superscripts:
+        text = text.str.replace(SUPERSCRIPT_AFTER_DIGIT, r' \1', regex=True).str.translate(SUPERSCRIPT_MAP)
+    return text.str.extract(FIRST_VALID_INT, expand=False).astype(float).to_numpy()
+
+class ParseCache:
+    """Parsed values of raw position strings, shared by all columns and runs.
+
+    Keys are (superscripts, raw string) so pp and the position columns never
+    mix; each holds a (position, margin) pair, the margin NaN for pp. Holds
+    at most `max_tokens` strings, dropping the least recently used. Hits and
+    misses count distinct strings per parse call.
+    """
+
+    def __init__(self, values=None, max_tokens=PARSE_CACHE_SIZE):
+        self.values = OrderedDict(values or {})
+        self.max_tokens = max_tokens
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def parse(self, text, superscripts=True):
+        return self.parse_with_margins(text, superscripts)[0]
+
+    def parse_with_margins(self, text, superscripts=True):
+        """(positions, margins) of `text`, as _parse_texts and _parse_margin_texts give them"""
+        keys = [(superscripts, t) for t in text]
+        parsed = np.empty((len(keys), 2))
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.values.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                self.values.move_to_end(key)
+                parsed[i] = value
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
 
-# Clean 'pp' column
-df['pp'] = df['pp'].apply(extract_first_int_pp)
+        # Only unseen strings reach the regex engine
+        if missing:
+            unseen = text.iloc[missing]
+            margins = _parse_margin_texts(unseen) if superscripts else np.full(len(missing), np.nan)
+            fresh = np.column_stack([_parse_texts(unseen, superscripts), margins])
+            parsed[missing] = fresh
+            self.values.update(zip((keys[i] for i in missing), map(tuple, fresh.tolist())))
+            while len(self.values) > self.max_tokens:
+                self.values.popitem(last=False)
+        return parsed[:, 0], parsed[:, 1]
 
-# Drop rows where 'pp' is NaN (i.e., no valid integer was found)
-df = df.dropna(subset=['pp'])
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        print(f"✅ Parse cache: {len(self)} strings known, {self.hits}/{lookups} lookups hit ({rate:.1%})")
 
-# Convert to float or int if needed
-df['pp'] = df['pp'].astype(int)
+def load_parse_cache(path=PARSE_CACHE_PATH):
+    if not os.path.exists(path):
+        return ParseCache()
+    # Caches saved before margins were cached hold bare positions: parse those strings again
+    return ParseCache({key: value for key, value in pd.read_pickle(path).items() if isinstance(value, tuple)})
+
+def save_parse_cache(cache, path=PARSE_CACHE_PATH):
+    pd.to_pickle(dict(cache.values), path)
+
+def parse_first_valid_ints(values, superscripts=True, cache=None):
+    """Vectorized extract_first_valid_int (extract_first_int_pp with superscripts=False).
+
+    Every distinct value is parsed once, so a column costs as much as its
+    vocabulary; with a ParseCache, strings seen before are not parsed at all.
+    Returns a float array with NaN where no valid integer was found.
+    """
+    codes, text = _factorize(values)
+    parsed = _parse_texts(text, superscripts) if cache is None else cache.parse(text, superscripts)
+    return _expand(parsed, codes)
+
+def _factorize(values):
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Series(uniques, dtype=object).astype(str)
+
+def _expand(parsed, codes):
+    # Missing values have code -1 and pick the trailing NaN
+    return np.append(parsed, np.nan)[codes]
+
+def _parse_margin_texts(text):
+    parts = text.str.extract(MARGIN)
+    numbers = parts[['whole', 'num', 'den']].apply(lambda col: pd.to_numeric(col.str.translate(SUPERSCRIPT_MAP)))
+    margin = (numbers['whole'].fillna(0) + (numbers['num'] / numbers['den']).fillna(0)
+              + parts['short'].map(SHORT_MARGINS).fillna(0))
+    return margin.where(parts.notna().any(axis=1)).to_numpy(dtype=float)
+
+def parse_margins(values):
+    """Lengths clear of the next horse from raw position strings, NaN when none is written."""
+    codes, text = _factorize(values)
+    return _expand(_parse_margin_texts(text), codes)
+
+def _sum_ahead(values, first):
+    # Running total of the horses before each one, restarting at every race
+    before = np.cumsum(values) - values
+    return before - before[first]
+
+def beaten_lengths(race, positions, margins):
+    """Lengths behind the leader: the margins of every horse ahead in the same race.
+
+    `race` numbers the races (-1 when unknown). NaN when the horse has no
+    position or a horse ahead of it has no margin.
+    """
+    # Positions are 1-15, so one integer key orders by race, then position (unknown last)
+    key = race.astype(np.int64) * 17 + np.nan_to_num(positions, nan=16).astype(np.int64)
+    order = np.argsort(key, kind='stable')
+    in_race = race[order]
+    new_race = np.r_[True, in_race[1:] != in_race[:-1]]
+    first = np.maximum.accumulate(np.where(new_race, np.arange(len(order)), 0))
+
+    known = ~np.isnan(margins[order])
+    ahead = _sum_ahead(np.where(known, margins[order], 0.0), first)
+    unknown_ahead = _sum_ahead((~known).astype(np.int64), first)
+
+    lengths = np.empty(len(order), dtype=np.float32)
+    lengths[order] = np.where(unknown_ahead == 0, ahead, np.nan)
+    lengths[np.isnan(positions) | (race < 0)] = np.nan
+    return lengths
+
+def _parsed_column(parsed, index):
+    # Integers when every cell parsed, like `.apply` gives
+    if not np.isnan(parsed).any():
+        parsed = parsed.astype(np.int64)
+    return pd.Series(parsed, index=index)
 
 # Columns to clean
 cols_to_clean = ['start', 'quarter', 'half', 'three_quarter', 'str', 'fin']
 
-# Apply the function to clean each column
-for col in cols_to_clean:
-    df[col] = df[col].apply(extract_first_valid_int)
+def clean_position_columns(df, cols=cols_to_clean, cache=None):
+    """Parse all position columns, and their beaten lengths, in one pass over their stacked values."""
+    codes, text = _factorize(pd.concat([df[col] for col in cols], ignore_index=True))
+    if cache is None:
+        parsed, margins = _parse_texts(text, True), _parse_margin_texts(text)
+    else:
+        parsed, margins = cache.parse_with_margins(text)
+    parsed = _expand(parsed, codes).reshape(len(cols), len(df))
+    margins = _expand(margins, codes).reshape(len(cols), len(df))
+    race = df.groupby(RACE_KEYS, sort=False).ngroup().to_numpy()
+    for col, values, margin in zip(cols, parsed, margins):
+        df[col] = _parsed_column(values, df.index)
+        df[f'{col}_lengths'] = beaten_lengths(race, values, margin)
+    return df
+
+def clean_races(df, cache=None):
+    df = df.copy()
+
+    # Clean 'pp' column
+    df['pp'] = _parsed_column(parse_first_valid_ints(df['pp'], superscripts=False, cache=cache), df.index)
+
+    # Drop rows where 'pp' is NaN (i.e., no valid integer was found)
+    df = df.dropna(subset=['pp'])
+
+    # Convert to float or int if needed
+    df['pp'] = df['pp'].astype(int)
+
+    # Clean every position column at once
+    return clean_position_columns(df, cache=cache)
+
+def _json_lines(path):
+    # Raw cells are text, whatever type the JSON gave them
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield {key: None if value is None else str(value) for key, value in json.loads(line).items()}
+
+def load_raw_races(path=None):
+    # Load the raw rows written by getting_excel.py
+    if path is None:
+        path = RAW_STORE if has_races(RAW_STORE) else "combined_race_data.xlsx"  # Replace with your actual filename
+    if os.path.isdir(path):
+        return read_races(path, RAW_SCHEMA)
+    if path.endswith('.csv'):
+        return pd.read_csv(path, dtype=str)
+    if path.endswith('.jsonl'):
+        return pd.DataFrame(list(_json_lines(path)))
+    if path.endswith('.json'):
+        return pd.read_json(path, dtype=str, convert_dates=False)
+    if path.endswith('.parquet'):
+        return pq.read_table(path).to_pandas()
+    return pd.read_excel(path)
+
+def _json_chunks(path, chunk_rows):
+    records = _json_lines(path)
+    while chunk := list(islice(records, chunk_rows)):
+        yield pd.DataFrame(chunk)
+
+def _frame_chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def iter_raw_races(path, chunk_rows=CLEAN_CHUNK_ROWS):
+    """load_raw_races in chunks of `chunk_rows` rows (raw store, CSV, JSON, JSON-lines or Parquet).
+
+    A JSON array is parsed whole and then split; the other formats stream.
+    """
+    if os.path.isdir(path):
+        return iter_races(path, RAW_SCHEMA, chunk_rows)
+    if path.endswith('.csv'):
+        return pd.read_csv(path, dtype=str, chunksize=chunk_rows)
+    if path.endswith('.jsonl'):
+        return _json_chunks(path, chunk_rows)
+    if path.endswith('.json'):
+        return _frame_chunks(pd.read_json(path, dtype=str, convert_dates=False), chunk_rows)
+    if path.endswith('.parquet'):
+        return (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+    raise ValueError(f"Cannot stream '{path}': use the raw store, CSV, JSON, JSON-lines or Parquet")
+
+def _last_race_start(df):
+    # First row of the trailing run of rows from the same race as the last row
+    same = np.ones(len(df), dtype=bool)
+    for col in RACE_KEYS:
+        values = df[col].to_numpy(dtype=object)
+        same &= (values == values[-1]) | (pd.isna(values) & pd.isna(values[-1]))
+    different = np.flatnonzero(~same)
+    return different[-1] + 1 if len(different) else 0
+
+def clean_in_chunks(chunks, cache=None):
+    """Clean raw chunks, carrying each chunk's last race over to the next one.
+
+    getting_excel.py writes a race's rows together, so every cleaned chunk
+    holds whole fields and beaten lengths come out as in the batch clean.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        start = _last_race_start(chunk)
+        carry = chunk.iloc[start:]
+        if start:
+            yield clean_races(chunk.iloc[:start], cache)
+    if carry is not None and not carry.empty:
+        yield clean_races(carry, cache)
+
+def _csv_rows(df):
+    if pd.api.types.is_datetime64_any_dtype(df['date']):
+        df = df.assign(date=df['date'].dt.strftime('%d-%m-%Y'))
+    return df
+
+def _drop_missing_days(horses, days):
+    # Days cleaned before but gone from the raw input: their rows must not linger
+    gone = race_days(CLEAN_STORE) - days
+    drop_days(CLEAN_STORE, gone)
+    horses.remove_days(horses.days - days)
+
+def save_cleaned_races(df, full=False):
+    """Write cleaned rows to the clean store, the horse index and cleaned_file.csv.
+
+    `full` says `df` holds every race day of the raw input, so days in the
+    clean store or the horse index that it lacks are removed.
+    """
+    # Save the typed store for Caculation.py
+    clean = to_clean_frame(df)
+    write_races(clean, CLEAN_STORE, CLEAN_SCHEMA)
+
+    # Append the new starts to the per-horse past performances
+    horses = load_horse_index()
+    if full:
+        _drop_missing_days(horses, set(zip(clean['track_name'], clean['date'])))
+    horses.add_races(df)
+    save_horse_index(horses)
+
+    # Save the cleaned file
+    _csv_rows(df).to_csv(CLEANED_CSV, index=False)
+
+    print(f"✅ Cleaning complete. Saved as '{CLEANED_CSV}'")
+
+def save_cleaned_chunks(chunks, full=False):
+    """save_cleaned_races for cleaned chunks, holding one chunk at a time.
+
+    Positions are written as floats until the whole run has been seen; a
+    column that never missed a value is then rewritten as integers, the way
+    the batch clean writes it.
+    """
+    horses = load_horse_index()
+    run_days = set()
+    complete = dict.fromkeys(cols_to_clean, True)
+
+    def clean_rows():
+        for i, df in enumerate(chunks):
+            for col in cols_to_clean:
+                complete[col] &= bool(df[col].notna().all())
+                df[col] = df[col].astype(float)
+            run_days.update(horses.add_races(df, keep_days=run_days))
+            _csv_rows(df).to_csv(CLEANED_CSV, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            yield to_clean_frame(df)
+
+    write_race_chunks(clean_rows(), CLEAN_STORE, CLEAN_SCHEMA)
+    if full:
+        _drop_missing_days(horses, run_days)
+    save_horse_index(horses)
+
+    int_cols = [col for col, full in complete.items() if full]
+    if int_cols and os.path.exists(CLEANED_CSV):
+        _rewrite_as_ints(CLEANED_CSV, int_cols)
+    print(f"✅ Cleaning complete. Saved as '{CLEANED_CSV}'")
+
+def _rewrite_as_ints(path, cols, chunk_rows=CLEAN_CHUNK_ROWS):
+    # Text round trip, so every other cell is written back unchanged
+    tmp_path = path + '.tmp'
+    reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+    for i, df in enumerate(reader):
+        for col in cols:
+            df[col] = df[col].str.replace(r'\.0$', '', regex=True)
+        df.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean raw chart rows into cleaned_file.csv and the clean store.")
+    parser.add_argument('--input', help="raw store directory, xlsx, CSV, JSON (.json array or .jsonl lines) or Parquet file "
+                                        "(default: the raw store, else combined_race_data.xlsx)")
+    parser.add_argument('--chunk-rows', type=int,
+                        help="stream the input in chunks of this many rows instead of loading it whole")
+    args = parser.parse_args()
 
-# Save the cleaned file
-df.to_csv("cleaned_file.csv", index=False)
+    cache = load_parse_cache()
+    path = args.input or (RAW_STORE if has_races(RAW_STORE) else "combined_race_data.xlsx")
+    # A store directory is read whole, so a day missing from it was deleted upstream
+    full = os.path.isdir(path)
+    if args.chunk_rows:
+        try:
+            chunks = iter_raw_races(path, args.chunk_rows)
+        except ValueError as e:
+            parser.error(str(e))
+        save_cleaned_chunks(clean_in_chunks(chunks, cache), full)
+    else:
+        save_cleaned_races(clean_races(load_raw_races(path), cache), full)
+    save_parse_cache(cache)
+    cache.report()
 
-print("✅ Cleaning complete. Saved as 'cleaned_file.csv'")
+if __name__ == "__main__":
+    main()
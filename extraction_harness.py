@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+from PIL import Image, ImageDraw, ImageFont
+
+from extraction_queue import ExtractionQueue
+from fake_vision_server import canned_records
+from getting_json import PAYLOAD_MAX_WIDTH, build_lanes, extract_images, prepare_image
+from run_results import append_run, git_commit
+from synthetic_races import generate_race_rows
+
+RESULTS_FILE = "extraction_bench_results.json"
+DEFAULT_IMAGES = 60
+DEFAULT_KEYS = [1, 3]
+DEFAULT_IN_FLIGHT = [1, 16]
+SERVER_START_SECONDS = 15
+CHART_WIDTH = 2550  # Crops are full 300 dpi page widths
+
+def make_chart_images(folder, n_images, seed=0):
+    """Chart-like crops drawn from synthetic rows, reused when already there"""
+    os.makedirs(folder, exist_ok=True)
+    font = ImageFont.load_default(size=30)
+    races = generate_race_rows(n_images * 12, seed=seed).groupby(['track_name', 'date', 'race_number'], sort=False)
+    paths = []
+    for i, (_, race) in enumerate(races):
+        if i == n_images:
+            break
+        path = os.path.join(folder, f"chart_{seed}_{i}.png")
+        if not os.path.exists(path):
+            image = Image.new("RGB", (CHART_WIDTH, 160 + 60 * len(race)), "white")
+            draw = ImageDraw.Draw(image)
+            cells = race.drop(columns=['track_name', 'date', 'race_number'])
+            for line, record in enumerate(cells.itertuples(index=False)):
+                draw.text((150, 80 + 60 * line), "   ".join(map(str, record)), fill="black", font=font)
+            image.save(path, dpi=(300, 300))
+        paths.append(path)
+    return paths
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _server_stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as response:
+        return json.load(response)
+
+def start_server(port, args):
+    """fake_vision_server.py in its own process, so it does not share our GIL"""
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_vision_server.py"),
+               "--port", str(port), "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--time-scale", str(args.time_scale), "--malformed", str(args.malformed),
+               "--corrupt", str(args.corrupt), "--errors", str(args.errors), "--seed", str(args.seed)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_SECONDS
+    while True:
+        try:
+            _server_stats(port)
+            return server
+        except OSError:
+            if time.monotonic() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError("fake_vision_server.py did not start")
+            time.sleep(0.1)
+
+async def _extract_and_close(queue, lanes, on_result, in_flight, max_width):
+    # Close the clients on this loop; left to the garbage collector they outlive it
+    try:
+        await extract_images(queue, lanes, on_result, max_in_flight=in_flight, max_width=max_width)
+    finally:
+        for lane in lanes:
+            await lane.client.close()
+
+def run_scenario(image_paths, truth, keys, in_flight, args, workdir):
+    """Extract every image with `keys` API keys and `in_flight` concurrent requests"""
+    port = _free_port()
+    server = start_server(port, args)
+    try:
+        queue = ExtractionQueue(os.path.join(workdir, f"queue_{keys}_{in_flight}.db"))
+        queue.add(image_paths)
+        # The fake keys get the real limits; `share` speeds our clock up like the server's
+        lanes = build_lanes([f"fake-key-{i}" for i in range(1, keys + 1)],
+                            base_url=f"http://127.0.0.1:{port}", share=args.time_scale)
+        results = {}
+        start = time.monotonic()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(_extract_and_close(queue, lanes, results.__setitem__, in_flight, args.max_width))
+        seconds = (time.monotonic() - start) * args.time_scale
+        stats = _server_stats(port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(row[0] * args.time_scale for row in queue.db.execute(
+        "SELECT latency FROM jobs WHERE status = 'done' AND latency IS NOT NULL"))
+    queue.close()
+    extracted = [path for path, data in results.items() if data is not None]
+
+    def percentile(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 2) if latencies else None
+
+    result = {
+        'keys': keys,
+        'in_flight': in_flight,
+        'images': len(image_paths),
+        'extracted': len(extracted),
+        'wrong': sum(results[path] != truth[path] for path in extracted),
+        'seconds': round(seconds, 1),
+        'images_per_minute': round(len(extracted) / seconds * 60, 1),
+        'p50_seconds': percentile(0.5),
+        'p95_seconds': percentile(0.95),
+        'p99_seconds': percentile(0.99),
+        'requests': stats.get('requests', 0),
+        'wasted_calls': stats.get('requests', 0) - len(extracted),
+        'rate_limited': stats.get('rate_limited', 0),
+        'malformed': stats.get('malformed', 0),
+        'errors': stats.get('errors', 0),
+    }
+    print(f"  {keys:>4} {in_flight:>9} {result['images_per_minute']:>11} {result['p50_seconds']:>7} "
+          f"{result['p95_seconds']:>7} {result['p99_seconds']:>7} {result['requests']:>8} "
+          f"{result['wasted_calls']:>7} {result['rate_limited']:>5} {result['extracted']:>9} {result['wrong']:>6}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure getting_json.py extraction throughput against the fake server.")
+    parser.add_argument('--images', type=int, default=DEFAULT_IMAGES)
+    parser.add_argument('--image-folder', help="crops to send (default: synthetic charts in a temp folder)")
+    parser.add_argument('--keys', type=int, nargs='+', default=DEFAULT_KEYS, help="API key counts to try")
+    parser.add_argument('--in-flight', type=int, nargs='+', default=DEFAULT_IN_FLIGHT,
+                        help="max requests in flight to try")
+    parser.add_argument('--latency', type=float, default=1.0, help="median seconds per reply")
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--malformed', type=float, default=0.0)
+    parser.add_argument('--corrupt', type=float, default=0.0)
+    parser.add_argument('--errors', type=float, default=0.0)
+    parser.add_argument('--max-width', type=int, default=PAYLOAD_MAX_WIDTH)
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="run faster than real time; results are converted back, but our own "
+                             "CPU time (image preparation) is scaled up with them")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        folder = args.image_folder or os.path.join(workdir, "charts")
+        if args.image_folder:
+            image_paths = sorted(os.path.join(folder, name) for name in os.listdir(folder))[:args.images]
+        else:
+            image_paths = make_chart_images(folder, args.images, args.seed)
+        # What the server will answer for each image, to count wrong extractions
+        truth = {path: canned_records(prepare_image(path, args.max_width)[0]) for path in image_paths}
+
+        print(f"\n📊 {len(image_paths)} images, {args.latency} s median latency, "
+              f"{args.malformed:.0%} malformed, {args.corrupt:.0%} corrupt, {args.errors:.0%} errors")
+        print("  keys in_flight  images/min     p50     p95     p99 requests  wasted   429 extracted  wrong")
+        run = {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'keys', 'in_flight')},
+            'results': [run_scenario(image_paths, truth, keys, in_flight, args, workdir)
+                        for keys in args.keys for in_flight in args.in_flight],
+        }
+
+    append_run(args.output, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+QUEUE_PATH = 'extraction_queue.db'
+LEASE_SECONDS = 30  # A claim not renewed for this long belongs to a worker that died
+STATUSES = ['pending', 'running', 'done', 'failed']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    image_path TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lane TEXT,          -- key / model of the last request
+    model TEXT,
+    latency REAL,       -- seconds the last request took, image preparation included
+    image_bytes INTEGER,
+    payload_bytes INTEGER,  -- what was sent after prepare_image
+    error TEXT,
+    worker TEXT,        -- host:pid holding the claim
+    claimed_at REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, attempts);
+"""
+ADDED_COLUMNS = {'image_bytes': 'INTEGER', 'payload_bytes': 'INTEGER'}  # Not in queues made before them
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class ExtractionQueue:
+    """Images to extract and what happened to each, in a SQLite file.
+
+    Every state change is committed at once, so a run that stops for any
+    reason resumes with the jobs it had not finished. Jobs are claimed in a
+    write transaction, so several processes can pull from one file. Workers
+    renew their claims while they run; a claim not renewed for LEASE_SECONDS
+    is handed to the next worker.
+    """
+
+    def __init__(self, path=QUEUE_PATH, worker=None):
+        self.worker = worker or worker_name()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    @contextmanager
+    def _transaction(self):
+        # Autocommit connection: take the write lock up front, commit once
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+
+    def add(self, image_paths, done=()):
+        """Queue new images and sync finished ones with the outputs on disk.
+
+        `done` holds the images whose output already exists: they are marked
+        done, and done images whose output is gone are queued again.
+        """
+        done = set(done)
+        now = time.time()
+        with self._transaction():
+            self.db.executemany("INSERT OR IGNORE INTO jobs (image_path, updated_at) VALUES (?, ?)",
+                                [(path, now) for path in image_paths])
+            self.db.executemany("UPDATE jobs SET status = 'done', updated_at = ? "
+                                "WHERE image_path = ? AND status != 'done'", [(now, path) for path in done])
+            self.db.executemany("UPDATE jobs SET status = 'pending', attempts = 0, updated_at = ? "
+                                "WHERE image_path = ? AND status = 'done'",
+                                [(now, path) for path in image_paths if path not in done])
+
+    def claim(self):
+        """Take the next job as (image_path, attempts, last lane), or None."""
+        now = time.time()
+        with self._transaction():
+            job = self.db.execute(
+                "SELECT image_path, attempts, lane FROM jobs "
+                "WHERE status = 'pending' OR (status = 'running' AND claimed_at < ?) "
+                "ORDER BY attempts, rowid LIMIT 1", (now - LEASE_SECONDS,)).fetchone()
+            if job is not None:
+                self.db.execute("UPDATE jobs SET status = 'running', worker = ?, claimed_at = ?, updated_at = ? "
+                                "WHERE image_path = ?", (self.worker, now, now, job[0]))
+        return job
+
+    def renew(self):
+        """Extend the claims this worker holds."""
+        self.db.execute("UPDATE jobs SET claimed_at = ? WHERE worker = ? AND status = 'running'",
+                        (time.time(), self.worker))
+
+    def release(self, image_path):
+        """Give a job back without counting an attempt, e.g. after a 429."""
+        self.db.execute("UPDATE jobs SET status = 'pending', worker = NULL, updated_at = ? "
+                        "WHERE image_path = ?", (time.time(), image_path))
+
+    def finish(self, image_path, ok, lane=None, model=None, latency=None, error=None, max_attempts=1,
+               image_bytes=None, payload_bytes=None):
+        """Record one attempt: done, pending again, or failed after `max_attempts`."""
+        with self._transaction():
+            attempts = self.db.execute("SELECT attempts FROM jobs WHERE image_path = ?",
+                                       (image_path,)).fetchone()[0] + 1
+            status = 'done' if ok else 'pending' if attempts < max_attempts else 'failed'
+            self.db.execute("UPDATE jobs SET status = ?, attempts = ?, lane = ?, model = ?, latency = ?, "
+                            "error = ?, image_bytes = ?, payload_bytes = ?, worker = NULL, updated_at = ? "
+                            "WHERE image_path = ?",
+                            (status, attempts, lane, model, latency, error, image_bytes, payload_bytes,
+                             time.time(), image_path))
+        return status
+
+    def retry_failed(self):
+        with self._transaction():
+            return self.db.execute("UPDATE jobs SET status = 'pending', attempts = 0, updated_at = ? "
+                                   "WHERE status = 'failed'", (time.time(),)).rowcount
+
+    def running_elsewhere(self):
+        """Jobs other live workers still hold, which may come back to the queue."""
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running' AND worker != ? "
+                               "AND claimed_at >= ?", (self.worker, time.time() - LEASE_SECONDS)).fetchone()[0]
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+    def report(self):
+        counts = self.counts()
+        print("Queue: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+        latencies = sorted(row[0] for row in self.db.execute(
+            "SELECT latency FROM jobs WHERE status = 'done' AND latency IS NOT NULL"))
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            print(f"  request latency {sum(latencies) / len(latencies):.1f} s average, {p95:.1f} s p95")
+        image_bytes, payload_bytes, sent = self.db.execute(
+            "SELECT SUM(image_bytes), SUM(payload_bytes), COUNT(*) FROM jobs "
+            "WHERE status = 'done' AND payload_bytes IS NOT NULL").fetchone()
+        if sent:
+            print(f"  payload {payload_bytes / sent / 1e3:.0f} KB per image, "
+                  f"{payload_bytes / image_bytes:.0%} of the {image_bytes / sent / 1e3:.0f} KB image files")
+
+    def close(self):
+        self.db.close()
+
+if __name__ == "__main__":
+    # Queue status, e.g. python extraction_queue.py failed
+    queue = ExtractionQueue()
+    queue.report()
+    for status in sys.argv[1:]:
+        for row in queue.db.execute("SELECT image_path, attempts, lane, latency, image_bytes, payload_bytes, error "
+                                    "FROM jobs WHERE status = ? ORDER BY rowid", (status,)):
+            print("  ".join(str(value) for value in row))
@@ -0,0 +1,215 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from getting_json import DEFAULT_RATE_LIMIT, RATE_LIMITS, TokenBucket
+from synthetic_races import generate_race_rows
+
+# Stand-in for the Groq chat-completions endpoint getting_json.py calls.
+# Run it and point the extractor at it, e.g.
+#   python fake_vision_server.py --port 8765 --malformed 0.1
+#   python getting_json.py --base-url http://127.0.0.1:8765
+CHAT_PATH = "/openai/v1/chat/completions"  # Where the Groq SDK posts
+DEFAULT_PORT = 8765
+PROMPT_TOKENS = 1800  # Prompt and image, as reported in usage
+TOKENS_PER_RECORD = 60  # Reply tokens per horse
+UPLOAD_BYTES_PER_SECOND = 2_000_000  # Added to the latency for the request body
+MALFORMED_KINDS = ['prose', 'truncated', 'single_quotes', 'bare_fence']
+CORRUPT_FIELDS = ['fin', 'odds', 'horse_name']
+
+def canned_records(payload):
+    """The race table this server returns for an image, fixed by the image's bytes"""
+    seed = int(hashlib.sha256(payload).hexdigest()[:8], 16)
+    rows = generate_race_rows(12, seed=seed)
+    race = rows[rows['race_number'] == rows['race_number'].iloc[0]]
+    return json.loads(race.drop(columns=['track_name', 'date', 'race_number']).to_json(orient='records'))
+
+def render_reply(records, kind=None):
+    """The reply text: fenced JSON like the real model, or one of MALFORMED_KINDS"""
+    text = json.dumps(records, indent=2, ensure_ascii=False)
+    if kind == 'prose':
+        return f"Here is the extracted race data:\n\n```json\n{text}\n```\n\nLet me know if you need anything else."
+    if kind == 'truncated':
+        return "```json\n" + text[:int(len(text) * 0.7)]
+    if kind == 'single_quotes':
+        return str(records)
+    if kind == 'bare_fence':
+        return f"```\n{text}\n```"
+    return f"```json\n{text}\n```"
+
+class FakeVisionServer(ThreadingHTTPServer):
+    """Chat-completions server with per-key rate limits, latency and bad replies
+
+    Each (API key, model) gets the request and token buckets of RATE_LIMITS,
+    and a request over budget gets a 429 with retry-after. `time_scale` runs
+    the clock faster: limits are multiplied by it and latencies divided.
+    Of the accepted requests, `errors` get a 500, `malformed` a reply the
+    model's usual format does not describe and `corrupt` valid JSON with a
+    field dropped. Counters are served at /stats.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=1.0, jitter=0.3, time_scale=1.0, rate_limit=None,
+                 malformed=0.0, corrupt=0.0, errors=0.0, seed=0):
+        super().__init__(address, FakeVisionHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.time_scale = time_scale
+        self.rate_limit = rate_limit  # (requests, tokens) per minute for every model, else RATE_LIMITS
+        self.malformed = malformed
+        self.corrupt = corrupt
+        self.errors = errors
+        self.random = random.Random(seed)
+        self.buckets = {}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def admit(self, api_key, model, tokens):
+        """Charge one request; returns seconds to wait instead, or 0 when admitted"""
+        with self.lock:
+            if (api_key, model) not in self.buckets:
+                requests_per_minute, tokens_per_minute = self.rate_limit or RATE_LIMITS.get(model, DEFAULT_RATE_LIMIT)
+                self.buckets[api_key, model] = (TokenBucket(requests_per_minute * self.time_scale),
+                                                TokenBucket(tokens_per_minute * self.time_scale))
+            requests, token_bucket = self.buckets[api_key, model]
+            wait = max(requests.wait_time(1), token_bucket.wait_time(tokens))
+            if wait == 0:
+                requests.take(1)
+                token_bucket.take(tokens)
+            return wait
+
+    def draw(self):
+        """Outcome of one admitted request: 'error', a malformed kind, 'corrupt' or None"""
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.errors:
+                return 'error'
+            if roll < self.errors + self.malformed:
+                return self.random.choice(MALFORMED_KINDS)
+            if roll < self.errors + self.malformed + self.corrupt:
+                return 'corrupt'
+            return None
+
+    def delay(self, payload_bytes):
+        with self.lock:
+            latency = self.random.lognormvariate(math.log(self.latency), self.jitter) if self.latency > 0 else 0.0
+        return (latency + payload_bytes / UPLOAD_BYTES_PER_SECOND) / self.time_scale
+
+    def count(self, *names):
+        with self.lock:
+            self.stats.update(names)
+
+class FakeVisionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/') != "/stats":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        with self.server.lock:
+            stats = dict(self.server.stats)
+        self._send_json(200, stats)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != CHAT_PATH:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        server = self.server
+        server.count('requests')
+        request = json.loads(body)
+        model = request.get("model")
+        api_key = self.headers.get("Authorization", "")
+
+        # The image is the data: URL next to the prompt
+        image_url = next(part["image_url"]["url"] for message in request["messages"]
+                         for part in message["content"] if part.get("type") == "image_url")
+        payload = base64.b64decode(image_url.split(",", 1)[1])
+        records = canned_records(payload)
+        tokens = PROMPT_TOKENS + TOKENS_PER_RECORD * len(records)
+
+        wait = server.admit(api_key, model, tokens)
+        if wait > 0:
+            server.count('rate_limited')
+            self._send_json(429, {"error": {"message": f"Rate limit reached for model `{model}`, "
+                                                       f"please try again in {wait:.2f}s",
+                                            "type": "tokens", "code": "rate_limit_exceeded"}},
+                            {"retry-after": f"{wait:.2f}"})
+            return
+
+        outcome = server.draw()
+        time.sleep(server.delay(len(payload)))
+        if outcome == 'error':
+            server.count('errors')
+            self._send_json(500, {"error": {"message": "Internal server error", "type": "internal_server_error"}})
+            return
+        if outcome == 'corrupt':
+            with server.lock:
+                victim = server.random.choice(records)
+                victim.pop(server.random.choice(CORRUPT_FIELDS), None)
+            server.count('corrupt')
+        elif outcome is not None:
+            server.count('malformed', f"malformed_{outcome}")
+        server.count('replies')
+
+        content = render_reply(records, outcome if outcome in MALFORMED_KINDS else None)
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{server.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": PROMPT_TOKENS, "completion_tokens": tokens - PROMPT_TOKENS,
+                      "total_tokens": tokens},
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the vision model getting_json.py calls.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=1.0, help="median seconds per reply")
+    parser.add_argument('--jitter', type=float, default=0.3, help="log-normal spread of the latency")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="run this many times faster than real time: limits up, latency down")
+    parser.add_argument('--rpm', type=float, help="requests per minute for every key and model")
+    parser.add_argument('--tpm', type=float, help="tokens per minute for every key and model")
+    parser.add_argument('--malformed', type=float, default=0.0, help="share of replies that are not plain JSON")
+    parser.add_argument('--corrupt', type=float, default=0.0, help="share of replies missing a field")
+    parser.add_argument('--errors', type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rate_limit = None
+    if args.rpm or args.tpm:
+        rate_limit = (args.rpm or DEFAULT_RATE_LIMIT[0], args.tpm or DEFAULT_RATE_LIMIT[1])
+    server = FakeVisionServer(("127.0.0.1", args.port), args.latency, args.jitter, args.time_scale, rate_limit,
+                              args.malformed, args.corrupt, args.errors, args.seed)
+    print(f"Fake vision server on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,177 @@
+import argparse
+import hashlib
 import os
 import json
+import numpy as np
 import pandas as pd
 import re
 
+# Optional dependency: `pip install orjson` parses race files several times faster;
+# without it the standard json module is used
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from race_store import (RAW_STORE, RAW_SCHEMA, drop_days, has_races, parse_race_dates,
+                        read_races, to_raw_frame, write_races)
+
 # Folder containing your JSON files
 folder_path = r"output_json"  # 🔁 Change this to your actual path
+output_path = "combined_race_data.xlsx"
+MANIFEST_PATH = "ingest_manifest.pkl"
+
+RACE_FILE = re.compile(r"(.*?)_(\d{2}-\d{2}-\d{4})_race_(\d+)\.json")
 
-# List to store all records
-all_records = []
+# One row per ingested file: what it looked like and which race it holds
+MANIFEST_COLS = ['file', 'size', 'mtime_ns', 'sha1', 'track_name', 'date', 'race_number']
 
 # Helper to clean track name
 def clean_track_name(track_str):
     return track_str.replace('_', ' ').title()
 
-# Loop through all JSON files
-for filename in os.listdir(folder_path):
-    if filename.endswith(".json"):
-        match = re.match(r"(.*?)_(\d{2}-\d{2}-\d{4})_race_(\d+)\.json", filename)
-        if match:
-            track_name_raw, race_date, race_number = match.groups()
-            track_name = clean_track_name(track_name_raw)
-
-            file_path = os.path.join(folder_path, filename)
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                print(f"⚠️ Skipping {filename}: {e}")
-                continue
-
-            for record in data:
-                record['track_name'] = track_name
-                record['date'] = race_date
-                record['race_number'] = race_number
-                all_records.append(record)
-# Convert all records to a DataFrame
-df = pd.DataFrame(all_records)
-
-# Save to Excel
-output_path = "combined_race_data.xlsx"
-df.to_excel(output_path, index=False)
+def _load_json(file_path):
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)  # orjson.JSONDecodeError is a json.JSONDecodeError
+    return json.loads(raw.decode("utf-8"))
+
+def _append_columns(columns, n_rows, new_columns, new_rows):
+    """Append `new_columns` (all `new_rows` long) to `columns`, padding either side with NaN."""
+    for key, values in new_columns.items():
+        if key not in columns:
+            columns[key] = [np.nan] * n_rows
+        columns[key].extend(values)
+    for values in columns.values():
+        if len(values) < n_rows + new_rows:
+            values.extend([np.nan] * (n_rows + new_rows - len(values)))
+    return n_rows + new_rows
+
+def _parse_race_files(folder_path, filenames):
+    """Parse race files straight into columns; returns ({column: values}, row count)."""
+    columns, n_rows = {}, 0
+    for filename in filenames:
+        match = RACE_FILE.match(filename)
+        if not match:
+            continue
+        track_name_raw, race_date, race_number = match.groups()
+
+        try:
+            data = _load_json(os.path.join(folder_path, filename))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"⚠️ Skipping {filename}: {e}")
+            continue
+        if not data:
+            continue
+
+        # Every record gets the race's track, date and number, like record['track_name'] = ...
+        race = {'track_name': clean_track_name(track_name_raw), 'date': race_date, 'race_number': race_number}
+        keys = dict.fromkeys([key for record in data for key in record] + list(race))
+        file_columns = {key: [race[key]] * len(data) if key in race else
+                        [record.get(key, np.nan) for record in data] for key in keys}
+        n_rows = _append_columns(columns, n_rows, file_columns, len(data))
+    return columns, n_rows
+
+def collect_race_records(folder_path=folder_path, filenames=None):
+    """Parse every race JSON in `folder_path` into one DataFrame, rows in directory order.
+
+    `filenames` restricts the run to those files. Parsing runs in this
+    process: a file takes about 0.1 ms, less than a process pool spends
+    sending its columns back.
+    """
+    if filenames is None:
+        filenames = [name for name in os.listdir(folder_path) if name.endswith(".json")]
+    columns, _ = _parse_race_files(folder_path, filenames)
+    return pd.DataFrame(columns)
+
+def scan_race_files(folder_path=folder_path):
+    """Size, mtime and race key of every race file, without opening any of them."""
+    rows = []
+    for entry in os.scandir(folder_path):
+        match = RACE_FILE.match(entry.name)
+        if not entry.name.endswith(".json") or not match:
+            continue
+        track_name_raw, race_date, race_number = match.groups()
+        stat = entry.stat()
+        rows.append((entry.name, stat.st_size, stat.st_mtime_ns,
+                     clean_track_name(track_name_raw), race_date, int(race_number)))
+    return pd.DataFrame(rows, columns=[col for col in MANIFEST_COLS if col != 'sha1'])
+
+def file_sha1(file_path):
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _race_days(files):
+    """(track, date) of the races in manifest rows."""
+    return pd.MultiIndex.from_arrays([files['track_name'], parse_race_dates(files['date'])])
+
+def update_race_store(folder_path=folder_path, manifest=None):
+    """Ingest only the race files that are new or changed since `manifest`.
+
+    A file whose size and mtime match its manifest row is not opened, any
+    other file is hashed. Each (track, date) with a new, changed or deleted
+    file is parsed again from all of its files and replaces that day in
+    RAW_STORE; the rest of the store is left alone. Returns the new manifest.
+    """
+    if manifest is None:
+        manifest = pd.DataFrame(columns=MANIFEST_COLS)
+    files = scan_race_files(folder_path).merge(
+        manifest[['file', 'size', 'mtime_ns', 'sha1']], on=['file', 'size', 'mtime_ns'], how='left')
+    touched = files['sha1'].isna()
+    files.loc[touched, 'sha1'] = [file_sha1(os.path.join(folder_path, name)) for name in files.loc[touched, 'file']]
+
+    changed = files['sha1'] != files['file'].map(manifest.set_index('file')['sha1'])
+    removed = manifest[~manifest['file'].isin(files['file'])]
+    days = set(_race_days(files[changed])) | set(_race_days(removed))
+    in_days = _race_days(files).isin(list(days))
+
+    df = collect_race_records(folder_path, filenames=files.loc[in_days, 'file'].tolist())
+    written = set()
+    if len(df):
+        raw = to_raw_frame(df)
+        write_races(raw, RAW_STORE, RAW_SCHEMA)
+        written = set(zip(raw['track_name'], raw['date']))
+    # Days left without any rows: every file deleted, emptied or unreadable
+    drop_days(RAW_STORE, {day for day in days - written if not pd.isna(day[1])})
+
+    print(f"✅ {changed.sum()} new or changed and {len(removed)} deleted race files, "
+          f"{len(days)} race days re-ingested, {(~changed).sum()} files unchanged")
+    return files[MANIFEST_COLS]
+
+def load_ingest_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path) or not has_races(RAW_STORE):
+        return None  # no manifest, or nothing it describes: ingest everything
+    return pd.read_pickle(path)
+
+def save_ingest_manifest(manifest, path=MANIFEST_PATH):
+    pd.to_pickle(manifest, path)
+
+def export_excel():
+    """Write the whole raw store to output_path."""
+    read_races(RAW_STORE, RAW_SCHEMA).to_excel(output_path, index=False)
+    print(f"✅ Combined Excel file saved to: {output_path}")
+
+def save_race_records(df, excel=False):
+    # Save to the Parquet store read by cleaning.py
+    write_races(to_raw_frame(df), RAW_STORE, RAW_SCHEMA)
+
+    # Excel export is slow and optional
+    if excel:
+        df.to_excel(output_path, index=False)
+        print(f"✅ Combined Excel file saved to: {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Add new or changed race JSON files to the raw Parquet store.")
+    parser.add_argument('--folder', default=folder_path)
+    parser.add_argument('--full', action='store_true', help=f"ignore {MANIFEST_PATH} and ingest every file")
+    parser.add_argument('--excel', action='store_true', help=f"also export {output_path}")
+    args = parser.parse_args()
+
+    manifest = None if args.full else load_ingest_manifest()
+    save_ingest_manifest(update_race_store(args.folder, manifest))
+    if args.excel:
+        export_excel()
 
-print(f"✅ Combined Excel file saved to: {output_path}")
+if __name__ == "__main__":
+    main()
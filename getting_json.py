@@ -1,12 +1,22 @@
-from groq import Groq
+from groq import AsyncGroq, RateLimitError
+import argparse
+import ast
+import asyncio
 import base64
+import hashlib
+import io
 import os
 import json
 import time
 import glob
+from functools import partial
+from multiprocessing import Process
 from pathlib import Path
 
 from dotenv import load_dotenv
+from PIL import Image
+
+from extraction_queue import LEASE_SECONDS, QUEUE_PATH, ExtractionQueue
 load_dotenv()  # Load .env file
 API_KEYS = [
     os.getenv("API_KEY_1"),
@@ -21,12 +31,65 @@ MODELS = [
 
 INPUT_FOLDER = r"cropped_images_1"  # Change this to your input folder path
 OUTPUT_FOLDER = "output_json"  # Change this to your output folder path
-DELAY_SECONDS = 3  # Delay between requests to avoid rate limiting
 
-def encode_image(image_path):
-    """Encode image to base64 string"""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+# Groq free-tier limits of one API key: (requests per minute, tokens per minute).
+# Raise them for paid keys; models not listed get DEFAULT_RATE_LIMIT.
+RATE_LIMITS = {
+    "meta-llama/llama-4-scout-17b-16e-instruct": (30, 30000),
+    "meta-llama/llama-4-maverick-17b-128e-instruct": (30, 6000),
+}
+DEFAULT_RATE_LIMIT = (30, 6000)
+TOKENS_PER_IMAGE = 2000  # First guess of one request's tokens, refined from the usage the API reports
+MAX_IN_FLIGHT = 16  # Requests awaiting a reply at once, across all keys
+MAX_ATTEMPTS = 3  # Tries per image before giving up (429s are not counted)
+BACKOFF_SECONDS = 2  # First pause after a 429 without retry-after, doubled on each one in a row
+POLL_SECONDS = 5  # How often an idle worker checks for jobs other workers may give back
+
+PROMPT_VERSION = 1  # Bump when create_prompt changes, so cached replies to the old prompt are not reused
+CACHE_FOLDER = "extraction_cache"  # Parsed replies keyed by image, model and prompt version
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+CACHE_BYPASS_MODELS = set()  # Models whose replies are never cached or served from the cache
+
+# What is sent for each crop, see prepare_image. Set PAYLOAD_MAX_WIDTH from a --calibrate run.
+PAYLOAD_MAX_WIDTH = 1600
+PAYLOAD_FORMAT = "PNG"  # PNG keeps small print sharp; JPEG blurs it and is larger for text
+GRAY_LEVELS = 16  # Fewer gray levels compress far better and still draw clean text
+TRIM_THRESHOLD = 200  # Pixels darker than this count as ink when trimming margins
+TRIM_PADDING = 10
+MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+SAVE_OPTIONS = {"PNG": {"optimize": True}, "JPEG": {"quality": 85, "optimize": True}, "WEBP": {"lossless": True}}
+CALIBRATION_WIDTHS = [2400, 2000, 1600, 1400, 1200, 1000, 800]
+CALIBRATION_ACCURACY = 0.99  # Share of the full-size extraction's fields a width must reproduce
+
+# Every record must have these keys (see create_prompt); the call positions may be null
+RECORD_FIELDS = ['last_raced', 'pgm', 'horse_name', 'jockey', 'wgt_me', 'pp', 'start', 'quarter', 'half',
+                 'three_quarter', 'str', 'fin', 'odds', 'comments']
+MAX_FOLLOWUPS = 1  # Targeted re-requests per image for records that fail validation or were cut off
+
+def prepare_image(image_path, max_width=PAYLOAD_MAX_WIDTH, image_format=PAYLOAD_FORMAT):
+    """Grayscale, margin-trimmed and downsampled bytes of a crop, and their MIME type
+
+    The crops are full-width 300 dpi RGB pages; the table needs neither the
+    color, the white margins nor all of that resolution.
+    """
+    with Image.open(image_path) as image:
+        image = image.convert("L")
+    
+    # Trim the white margins around the table
+    box = image.point(lambda level: 255 if level < TRIM_THRESHOLD else 0).getbbox()
+    if box:
+        left, top, right, bottom = box
+        image = image.crop((max(0, left - TRIM_PADDING), max(0, top - TRIM_PADDING),
+                            min(image.width, right + TRIM_PADDING), min(image.height, bottom + TRIM_PADDING)))
+    
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    step = 256 // GRAY_LEVELS
+    image = image.point(lambda level: level // step * 255 // (GRAY_LEVELS - 1))
+    
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS[image_format])
+    return buffer.getvalue(), MIME_TYPES[image_format]
 
 def create_prompt():
     """Create a detailed prompt for extracting horse racing data"""
@@ -72,58 +135,551 @@ def create_prompt():
     Return ONLY the JSON array, no other text and please dont convert the power into number.
     """
 
-def process_image_with_groq(image_path, api_key, model):
-    """Process a single image with Groq API"""
-    try:
-        # Encode image
-        base64_image = encode_image(image_path)
-        
-        # Create client - this should work after fixing httpx version
-        client = Groq(api_key=api_key)
-        
-        # Create chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
+def create_followup_prompt(records, truncated):
+    """Ask again for only the horses whose records failed validation, and the rest of a cut-off table"""
+    wanted = []
+    incomplete = [record for record in records if invalid_fields(record)]
+    if incomplete:
+        horses = "; ".join(f"pgm {record.get('pgm', '?')} {record.get('horse_name') or ''}".strip()
+                           for record in incomplete)
+        wanted.append(f"these horses: {horses}")
+    if truncated:
+        complete = [record for record in records if not invalid_fields(record)]
+        wanted.append(f"every horse listed after {complete[-1].get('horse_name')}" if complete else "every horse")
+    return f"""
+    Analyze this horse racing image and extract the race results data again, but ONLY for
+    {' and '.join(wanted)}.
+    
+    Return them as a JSON array of objects with exactly these keys:
+    {', '.join(RECORD_FIELDS)}
+    Use null for a position the chart leaves empty.
+    
+    Return ONLY the JSON array, no other text and please dont convert the power into number.
+    """
+
+def build_messages(base64_image, mime_type, prompt=None):
+    """Chat messages asking the model to extract one chart image, with create_prompt unless `prompt` is given"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt or create_prompt()},
                 {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": create_prompt()},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                            },
-                        },
-                    ],
-                }
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime_type};base64,{base64_image}",
+                    },
+                },
             ],
-            model=model,
-        )
-        
-        response_content = chat_completion.choices[0].message.content
-        
-        # Try to parse JSON from response
+        }
+    ]
+
+def _object_spans(text):
+    """(start, end) of every top-level {...} in `text`, and whether the text was cut off
+
+    Strings in either quote style are skipped, so braces or quotes inside a
+    comment do not end a record. Everything outside the objects (fences,
+    prose, the array brackets) is ignored.
+    """
+    spans = []
+    depth = 0
+    start = quote = None
+    escaped = in_array = False
+    for i, char in enumerate(text):
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif depth:
+            if char in '"\'':
+                quote = char
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    spans.append((start, i + 1))
+        elif char == '{':
+            depth, start = 1, i
+        elif char == '[':
+            in_array = True
+        elif char == ']':
+            in_array = False
+    return spans, depth > 0 or in_array
+
+def _load_record(text):
+    try:
+        record = json.loads(text)
+    except json.JSONDecodeError:
         try:
-            # Clean the response - remove any markdown formatting
-            cleaned_response = response_content.strip()
-            if cleaned_response.startswith('```json'):
-                cleaned_response = cleaned_response[7:]
-            if cleaned_response.endswith('```'):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-            
-            # Parse JSON
-            parsed_data = json.loads(cleaned_response)
-            return parsed_data
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error for {image_path}: {e}")
-            print(f"Raw response: {response_content}")
+            record = ast.literal_eval(text)  # Python-style dict: single quotes, None
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
             return None
-            
-    except Exception as e:
-        print(f"Error processing {image_path} with {model}: {e}")
+    return record if isinstance(record, dict) else None
+
+def salvage_records(response_content):
+    """Every record that can be read from a reply, and whether the reply was cut off
+
+    Works on clean JSON as well as on replies with fences anywhere, prose
+    around the array, single quotes or a last record that never closed.
+    """
+    spans, truncated = _object_spans(response_content or "")
+    records = [_load_record(response_content[start:end]) for start, end in spans]
+    return [record for record in records if record is not None], truncated
+
+def invalid_fields(record):
+    """The RECORD_FIELDS a record lacks, with horse_name also when it is empty"""
+    missing = [field for field in RECORD_FIELDS if field not in record]
+    if 'horse_name' not in missing and not str(record['horse_name'] or '').strip():
+        missing.append('horse_name')
+    return missing
+
+def _record_key(record):
+    # Program number, else the name: a record may have lost either
+    pgm = str(record.get('pgm') if record.get('pgm') is not None else '').strip().lower()
+    return pgm or ' '.join(str(record.get('horse_name') or '').lower().split())
+
+def merge_followup(records, truncated, followup):
+    """`records` with failed ones replaced from a follow-up reply, and the missing tail added if cut off"""
+    replacements = {_record_key(record): record for record in followup if not invalid_fields(record)}
+    merged = []
+    for record in records:
+        replacement = replacements.pop(_record_key(record), None)
+        merged.append(replacement if replacement is not None and invalid_fields(record) else record)
+    if truncated:
+        # The missing tail, failed records included so they still count as incomplete
+        seen = {_record_key(record) for record in records}
+        merged.extend(record for record in followup if _record_key(record) not in seen)
+    return merged
+
+def parse_response(response_content, image_path):
+    """Parse the model's reply into the list of horse records, or None"""
+    records, truncated = salvage_records(response_content)
+    if not records:
+        print(f"No records found in the reply for {image_path}")
+        print(f"Raw response: {response_content}")
+        return None
+    if truncated:
+        print(f"Reply for {image_path} was cut off, kept its {len(records)} complete records")
+    return records
+
+class ExtractionCache:
+    """Parsed replies on disk, one JSON file per (image bytes, model, prompt version)
+
+    A crop that was extracted before, e.g. after a PDF is downloaded again or
+    the crop step re-run, is answered without a request. Files are written
+    atomically, so several processes can share the folder; past `max_bytes`
+    the least recently used entries are removed.
+    """
+
+    def __init__(self, folder=CACHE_FOLDER, max_bytes=CACHE_MAX_BYTES, bypass_models=CACHE_BYPASS_MODELS):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.bypass_models = set(bypass_models)
+        self.hits = 0
+        self.misses = 0
+        Path(folder).mkdir(parents=True, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(folder))
+
+    def _path(self, image_digest, model):
+        key = hashlib.sha256(f"{image_digest}|{model}|{PROMPT_VERSION}".encode()).hexdigest()
+        return os.path.join(self.folder, f"{key}.json")
+
+    def get(self, image_digest, models):
+        """Cached records of the image from the first of `models` that has them, or None"""
+        for model in models:
+            if model in self.bypass_models:
+                continue
+            path = self._path(image_digest, model)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                os.utime(path)  # Mark as recently used
+            except (OSError, json.JSONDecodeError):
+                continue
+            self.hits += 1
+            return data
+        self.misses += 1
+        return None
+
+    def put(self, image_digest, model, data):
+        if data is None or model in self.bypass_models:
+            return
+        path = self._path(image_digest, model)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        self.size += os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is at 90% of max_bytes"""
+        entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                         for entry in os.scandir(self.folder) if entry.name.endswith('.json'))
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= 0.9 * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        print(f"Extraction cache: {self.hits}/{lookups} images answered from cache ({rate:.1%}), "
+              f"{self.size / 1e6:.1f} MB stored")
+
+def image_digest(image_path, max_width=PAYLOAD_MAX_WIDTH):
+    """SHA-256 of the image file's bytes and of how they are prepared for sending"""
+    with open(image_path, "rb") as image_file:
+        digest = hashlib.sha256(image_file.read())
+    digest.update(f"|{max_width}|{PAYLOAD_FORMAT}|{GRAY_LEVELS}|{TRIM_THRESHOLD}|{TRIM_PADDING}".encode())
+    return digest.hexdigest()
+
+class TokenBucket:
+    """Allows `per_minute` units a minute, refilled continuously up to one minute's worth"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available"""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount):
+        # May go below zero: the debt is paid back before the next request
+        self._refill()
+        self.level -= amount
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0)
+
+class Lane:
+    """One API key and model, with its own request and token buckets"""
+
+    def __init__(self, key_name, client, model, share=1.0):
+        # `share` of the key's limits, when several processes use the same key
+        requests_per_minute, tokens_per_minute = RATE_LIMITS.get(model, DEFAULT_RATE_LIMIT)
+        self.name = f"{key_name} / {model}"
+        self.client = client
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute * share)
+        self.tokens = TokenBucket(tokens_per_minute * share)
+        self.tokens_per_request = TOKENS_PER_IMAGE
+        self.paused_until = 0.0
+        self.strikes = 0  # 429s in a row
+        self.sent = 0
+        self.rate_limited = 0
+
+    def ready_in(self):
+        """Seconds until this lane may send its next request"""
+        return max(self.paused_until - time.monotonic(),
+                   self.requests.wait_time(1),
+                   self.tokens.wait_time(self.tokens_per_request))
+
+    def acquire(self):
+        """Take one request's budget and return the tokens charged for it"""
+        self.requests.take(1)
+        self.tokens.take(self.tokens_per_request)
+        self.sent += 1
+        return self.tokens_per_request
+
+    def settle(self, charged, used):
+        """Correct the token bucket with the usage the API reported"""
+        self.strikes = 0
+        if used is None:
+            return
+        self.tokens.take(used - charged)
+        self.tokens_per_request = 0.8 * self.tokens_per_request + 0.2 * used
+
+    def back_off(self, retry_after):
+        """Pause the lane after a 429, for retry-after seconds when the server sent it"""
+        self.strikes += 1
+        self.rate_limited += 1
+        pause = retry_after if retry_after is not None else BACKOFF_SECONDS * 2 ** (self.strikes - 1)
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self.requests.drain()
+        return pause
+
+def build_lanes(api_keys=API_KEYS, models=MODELS, base_url=None, share=1.0):
+    """One lane per configured API key and model
+
+    `base_url` points the clients at another server, e.g. a local fake one;
+    the Groq SDK also reads it from GROQ_BASE_URL.
+    """
+    lanes = []
+    for key_number, api_key in enumerate(api_keys, 1):
+        if not api_key:
+            continue
+        # 429s are retried by the scheduler, which knows about the other lanes
+        client = AsyncGroq(api_key=api_key, base_url=base_url, max_retries=0)
+        lanes.extend(Lane(f"key {key_number}", client, model, share) for model in models)
+    return lanes
+
+async def request_extraction(client, model, image_path, max_width=PAYLOAD_MAX_WIDTH, prompt=None):
+    """Send one image and return the reply text, the tokens it used and the payload's size"""
+    payload, mime_type = await asyncio.to_thread(prepare_image, image_path, max_width)
+    chat_completion = await client.chat.completions.create(
+        messages=build_messages(base64.b64encode(payload).decode('utf-8'), mime_type, prompt),
+        model=model,
+    )
+    usage = chat_completion.usage
+    return chat_completion.choices[0].message.content, usage.total_tokens if usage else None, len(payload)
+
+def retry_after_seconds(error):
+    """Seconds a 429 response asked us to wait, or None"""
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
         return None
 
+def _next_lane(lanes, avoid=None):
+    """The lane that can send soonest, and how many seconds until it can
+
+    Ties go to the lane with the most request budget left, which spreads a
+    burst over every key instead of emptying the first one. The lane named
+    `avoid`, where the image last failed, is used only if it is the only one.
+    """
+    candidates = [lane for lane in lanes if lane.name != avoid] or lanes
+    wait, _, _, lane = min((lane.ready_in(), -lane.requests.level / lane.requests.capacity, i, lane)
+                           for i, lane in enumerate(candidates))
+    return wait, lane
+
+async def _renew_claims(queue):
+    """Keep this worker's claims alive while its requests are in flight"""
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        queue.renew()
+
+async def extract_images(queue, lanes, on_result, max_in_flight=MAX_IN_FLIGHT,
+                         max_attempts=MAX_ATTEMPTS, cache=None, max_width=PAYLOAD_MAX_WIDTH):
+    """Extract the images in `queue` as fast as the lanes' rate limits allow
+
+    A request starts as soon as any lane has budget for it, on the lane that
+    is ready first, with up to `max_in_flight` awaiting replies. A 429 pauses
+    only its lane and gives the image back to the queue; other failures are
+    retried, on another lane when there is one, up to `max_attempts` times.
+    `on_result(image_path, data)` is called for every extracted image, and
+    with None for images that failed every attempt. Images found in `cache`
+    for any lane's model are answered from it without a request.
+    
+    Replies are salvaged record by record. When some records fail
+    validation or the reply was cut off, the image is sent once more
+    asking for only those horses, and the answers are merged in. An image
+    still incomplete or cut off after MAX_FOLLOWUPS counts as a failed
+    attempt, and a failed follow-up is retried from the records it had.
+    """
+    models = list(dict.fromkeys(lane.model for lane in lanes))
+    running = {}  # task -> (image_path, digest, lane, tokens charged, start time, pending)
+    job = None  # (image_path, last lane, digest, pending) waiting for a lane
+    followups = []  # Jobs whose pending follow-up (records, truncated, follow-ups sent) needs another request
+    salvaged = {}  # image_path -> pending follow-up that failed, for the image's next attempt
+    heartbeat = asyncio.create_task(_renew_claims(queue))
+    try:
+        while True:
+            wait = None
+            while len(running) < max_in_flight:
+                if job is None and followups:
+                    job = followups.pop()
+                if job is None:
+                    claimed = queue.claim()
+                    if claimed is None:
+                        break
+                    image_path, _, last_lane = claimed
+                    digest = image_digest(image_path, max_width) if cache is not None else None
+                    cached = cache.get(digest, models) if cache is not None else None
+                    if cached is not None:
+                        on_result(image_path, cached)
+                        queue.finish(image_path, True, lane="cache")
+                        continue
+                    job = (image_path, last_lane, digest, salvaged.pop(image_path, None))
+                image_path, last_lane, digest, pending = job
+                wait, lane = _next_lane(lanes, avoid=last_lane)
+                if wait > 0:
+                    break
+                wait = None
+                prompt = create_followup_prompt(*pending[:2]) if pending else None
+                task = asyncio.create_task(request_extraction(lane.client, lane.model, image_path, max_width, prompt))
+                running[task] = (image_path, digest, lane, lane.acquire(), time.monotonic(), pending)
+                job = None
+
+            if not running:
+                if job is not None:
+                    await asyncio.sleep(wait)
+                    continue
+                if queue.running_elsewhere():
+                    # Other workers' jobs come back to the queue if those workers die
+                    await asyncio.sleep(POLL_SECONDS)
+                    continue
+                return
+            done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                image_path, digest, lane, charged, started, pending = running.pop(task)
+                latency = time.monotonic() - started
+                payload_bytes = None
+                try:
+                    response_content, used, payload_bytes = task.result()
+                except RateLimitError as e:
+                    pause = lane.back_off(retry_after_seconds(e))
+                    print(f"Rate limited on {lane.name}, pausing it for {pause:.1f} seconds")
+                    if pending:
+                        followups.append((image_path, None, digest, pending))
+                    else:
+                        queue.release(image_path)
+                    continue
+                except Exception as e:
+                    print(f"Error processing {image_path} with {lane.model}: {e}")
+                    data, error = None, str(e)
+                    if pending:
+                        salvaged[image_path] = pending
+                else:
+                    lane.settle(charged, used)
+                    records, truncated = salvage_records(response_content)
+                    sent = 0
+                    if pending:
+                        records, sent = merge_followup(pending[0], pending[1], records), pending[2]
+                    incomplete = sum(1 for record in records if invalid_fields(record))
+                    if records and (incomplete or truncated) and sent < MAX_FOLLOWUPS:
+                        print(f"Re-requesting {incomplete} incomplete records{' and the cut-off rest' if truncated else ''}"
+                              f" of {image_path}")
+                        followups.append((image_path, None, digest, (records, truncated, sent + 1)))
+                        continue
+                    if not records:
+                        print(f"No records found in the reply for {image_path}")
+                        data, error = None, "unparseable reply"
+                    elif incomplete or truncated:
+                        # A partial table would shift the odds ranks and winners of its races
+                        error = f"{incomplete} incomplete records{', cut off' if truncated else ''}"
+                        print(f"Still {error} in the reply for {image_path}")
+                        data = None
+                    else:
+                        data, error = records, None
+                        if cache is not None:
+                            cache.put(digest, lane.model, data)
+
+                if data is not None:
+                    on_result(image_path, data)
+                status = queue.finish(image_path, data is not None, lane.name, lane.model, latency, error,
+                                      max_attempts, os.path.getsize(image_path), payload_bytes)
+                if status == 'failed':
+                    salvaged.pop(image_path, None)
+                    on_result(image_path, None)
+    finally:
+        heartbeat.cancel()
+
+def output_path_for(image_path, output_folder=OUTPUT_FOLDER):
+    return os.path.join(output_folder, f"{Path(image_path).stem}.json")
+
+def save_extraction(image_path, data, output_folder=OUTPUT_FOLDER):
+    """Save one image's records to `output_folder`"""
+    if data is None:
+        print(f"Failed to process {image_path}")
+        return
+    save_json_result(data, output_path_for(image_path, output_folder))
+
+def field_accuracy(reference, records):
+    """Share of the fields in `reference` that `records` reproduce, horse by horse"""
+    total = matched = 0
+    for i, expected in enumerate(reference or []):
+        got = records[i] if isinstance(records, list) and i < len(records) and isinstance(records[i], dict) else {}
+        for key, value in expected.items():
+            total += 1
+            matched += str(got.get(key)).strip() == str(value).strip()
+    return matched / total if total else 1.0
+
+async def _extract_now(lanes, image_path, max_width):
+    """One image on the first lane with budget, waiting out rate limits"""
+    while True:
+        wait, lane = _next_lane(lanes)
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        charged = lane.acquire()
+        started = time.monotonic()
+        try:
+            response_content, used, payload_bytes = await request_extraction(lane.client, lane.model, image_path, max_width)
+        except RateLimitError as e:
+            lane.back_off(retry_after_seconds(e))
+            continue
+        lane.settle(charged, used)
+        return parse_response(response_content, image_path), payload_bytes, time.monotonic() - started
+
+async def calibrate_payload(image_paths, lanes, widths=CALIBRATION_WIDTHS):
+    """Find the smallest PAYLOAD_MAX_WIDTH that extracts as well as full size
+
+    Each sample is extracted at full size (after trimming) as the reference
+    and again at every width, on one model so only the image changes.
+    Returns (width, accuracy, mean payload bytes, mean latency) rows.
+    """
+    lanes = [lane for lane in lanes if lane.model == lanes[0].model]
+    references = await asyncio.gather(*(_extract_now(lanes, path, None) for path in image_paths))
+    rows = [(None, 1.0, sum(r[1] for r in references) / len(references),
+             sum(r[2] for r in references) / len(references))]
+    for width in widths:
+        results = await asyncio.gather(*(_extract_now(lanes, path, width) for path in image_paths))
+        accuracy = sum(field_accuracy(reference[0], result[0])
+                       for reference, result in zip(references, results)) / len(results)
+        rows.append((width, accuracy, sum(r[1] for r in results) / len(results),
+                     sum(r[2] for r in results) / len(results)))
+    return rows
+
+def run_calibration(image_files, samples, base_url=None):
+    lanes = build_lanes(base_url=base_url)
+    if not lanes:
+        print("No API keys configured, set API_KEY_1 ... in .env")
+        return
+    sample = sorted(image_files)[::max(1, len(image_files) // samples)][:samples]
+    image_bytes = sum(os.path.getsize(path) for path in sample) / len(sample)
+    print(f"Calibrating on {len(sample)} images with {lanes[0].model}, {image_bytes / 1e3:.0f} KB per image file")
+    
+    rows = asyncio.run(calibrate_payload(sample, lanes))
+    for width, accuracy, payload_bytes, latency in rows:
+        print(f"  width {width or 'full':>5}: {accuracy:6.1%} of fields, {payload_bytes / 1e3:5.0f} KB "
+              f"({payload_bytes / image_bytes:4.0%} of the file), {latency:.1f} s per request")
+    good = [width for width, accuracy, _, _ in rows[1:] if accuracy >= CALIBRATION_ACCURACY]
+    if good:
+        print(f"Smallest width reproducing {CALIBRATION_ACCURACY:.0%} of fields: set PAYLOAD_MAX_WIDTH = {min(good)}")
+    else:
+        print("No width reproduced the full-size extraction, set PAYLOAD_MAX_WIDTH = None")
+
+def run_worker(output_folder=OUTPUT_FOLDER, base_url=None, share=1.0, queue_path=QUEUE_PATH,
+               max_width=PAYLOAD_MAX_WIDTH):
+    """Extract queued images until the queue is empty; one of `--workers` processes"""
+    lanes = build_lanes(base_url=base_url, share=share)
+    if not lanes:
+        print("No API keys configured, set API_KEY_1 ... in .env")
+        return
+    queue = ExtractionQueue(queue_path)
+    cache = ExtractionCache()
+    
+    # Every key and model sends requests as fast as its own rate limits allow
+    asyncio.run(extract_images(queue, lanes, partial(save_extraction, output_folder=output_folder),
+                               cache=cache, max_width=max_width))
+    
+    for lane in lanes:
+        print(f"{lane.name}: {lane.sent} requests, {lane.rate_limited} rate limited")
+    cache.report()
+    queue.close()
+
 def get_image_files(folder_path):
     """Get all image files from the folder with better debugging"""
     image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
@@ -195,80 +751,71 @@ def save_json_result(data, output_path):
 
 def main():
     """Main function to process all images"""
+    parser = argparse.ArgumentParser(description="Extract race tables from chart images, resuming where the last run stopped.")
+    parser.add_argument('--input', default=INPUT_FOLDER)
+    parser.add_argument('--output', default=OUTPUT_FOLDER)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes pulling from the queue; each gets an equal share of the rate limits")
+    parser.add_argument('--retry-failed', action='store_true', help="queue images that failed every attempt again")
+    parser.add_argument('--base-url', help="send requests to this server instead of Groq")
+    parser.add_argument('--max-width', type=int, default=PAYLOAD_MAX_WIDTH,
+                        help="downsample wider crops to this many pixels (0 keeps full size)")
+    parser.add_argument('--calibrate', type=int, metavar='N',
+                        help="extract N sample images at several widths to pick PAYLOAD_MAX_WIDTH, then exit")
+    args = parser.parse_args()
+    
+    print("Horse Racing Data Extractor")
+    print("=" * 50)
+    print(f"Input folder: {args.input}")
+    print(f"Output folder: {args.output}")
+    print(f"API keys configured: {sum(1 for key in API_KEYS if key)}")
+    print(f"Models configured: {len(MODELS)}")
+    print(f"Max requests in flight: {MAX_IN_FLIGHT} per worker, {args.workers} workers")
+    print("=" * 50)
+    
     # Create output folder if it doesn't exist
-    Path(OUTPUT_FOLDER).mkdir(parents=True, exist_ok=True)
+    Path(args.output).mkdir(parents=True, exist_ok=True)
     
     # DEBUG: Show folder contents
-    debug_folder_contents(INPUT_FOLDER)
+    debug_folder_contents(args.input)
     
     # Get all image files
-    image_files = get_image_files(INPUT_FOLDER)
+    image_files = get_image_files(args.input)
     
     if not image_files:
-        print(f"No image files found in {INPUT_FOLDER}")
+        print(f"No image files found in {args.input}")
         return
     
-    print(f"\nFound {len(image_files)} image files to process")
-    print("Image files:")
-    for i, img in enumerate(image_files, 1):
-        print(f"  {i}. {os.path.basename(img)}")
-    
-    # Ask for confirmation before processing
-    user_input = input(f"\nProceed with processing {len(image_files)} images? (y/n): ")
-    if user_input.lower() != 'y':
-        print("Processing cancelled.")
+    if args.calibrate:
+        run_calibration(image_files, args.calibrate, args.base_url)
         return
     
+    # Images whose JSON is already in the output folder are not sent again
+    queue = ExtractionQueue()
+    queue.add(sorted(image_files),
+              done=[path for path in image_files if os.path.exists(output_path_for(path, args.output))])
+    if args.retry_failed:
+        print(f"Retrying {queue.retry_failed()} failed images")
+    queue.report()
+    
     print("\nStarting processing...")
     print("=" * 50)
     
-    # Process each image
-    api_key_index = 0
-    model_index = 0
+    start = time.monotonic()
+    if args.workers > 1:
+        workers = [Process(target=run_worker, args=(args.output, args.base_url, 1 / args.workers,
+                                                    QUEUE_PATH, args.max_width or None))
+                   for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    else:
+        run_worker(args.output, args.base_url, max_width=args.max_width or None)
+    elapsed = time.monotonic() - start
     
-    for i, image_path in enumerate(image_files):
-        print(f"\nProcessing {i+1}/{len(image_files)}: {os.path.basename(image_path)}")
-        
-        # Get current API key and model
-        current_api_key = API_KEYS[api_key_index % len(API_KEYS)]
-        current_model = MODELS[model_index % len(MODELS)]
-        
-        print(f"Using API key {api_key_index + 1} with model: {current_model}")
-        
-        # Process the image
-        result = process_image_with_groq(image_path, current_api_key, current_model)
-        
-        if result:
-            # Create output filename
-            image_filename = Path(image_path).stem
-            output_filename = f"{image_filename}.json"
-            output_path = os.path.join(OUTPUT_FOLDER, output_filename)
-            
-            # Save result
-            save_json_result(result, output_path)
-        else:
-            print(f"Failed to process {image_path}")
-        
-        # Rotate API keys and models
-        api_key_index = (api_key_index + 1) % len(API_KEYS)
-        model_index = (model_index + 1) % len(MODELS)
-        
-        # Wait before next request (except for the last image)
-        if i < len(image_files) - 1:
-            print(f"Waiting {DELAY_SECONDS} seconds before next request...")
-            time.sleep(DELAY_SECONDS)
-    
-    print(f"\nProcessing complete! Results saved in {OUTPUT_FOLDER}")
+    queue.report()
+    print(f"\nProcessing complete in {elapsed:.0f} seconds! Results saved in {args.output}")
 
 if __name__ == "__main__":
-    # Update these paths and API keys before running
-    print("Horse Racing Data Extractor")
-    print("=" * 50)
-    print(f"Input folder: {INPUT_FOLDER}")
-    print(f"Output folder: {OUTPUT_FOLDER}")
-    print(f"API keys configured: {len(API_KEYS)}")
-    print(f"Models configured: {len(MODELS)}")
-    print(f"Delay between requests: {DELAY_SECONDS} seconds")
-    print("=" * 50)
-    
     main()
\ No newline at end of file
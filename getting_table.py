@@ -1,10 +1,19 @@
 import os
 import re
+import math
+import argparse
+import queue
+import subprocess
+import tempfile
+import threading
+import time
 import traceback
 from shutil import move
 from pathlib import Path
 from difflib import SequenceMatcher
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
 
 import pandas as pd
 import pytesseract
@@ -17,51 +26,98 @@ poppler_path = r'Release-24.08.0-0/poppler-24.08.0/Library/bin'
 tesseract_cmd_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 pytesseract.pytesseract.tesseract_cmd = tesseract_cmd_path
 
+# Pipeline: downloads in threads, locating (text layer or OCR) and crop + encode in processes
+DOWNLOAD_WORKERS = 5  # I/O bound, mostly waiting on the server
+OCR_WORKERS = os.cpu_count() or 4  # One pdftotext or Tesseract process per core
+CROP_WORKERS = max(1, (os.cpu_count() or 4) // 4)  # Rasterizing the segments and PNG encoding
+QUEUE_SIZE = 4  # Items waiting between two stages before the one feeding them blocks
+REPORT_SECONDS = 60
+PDF_DPI = 300
+MIN_TEXT_WORDS = 20  # Fewer words in a page's text layer means a scan, which is OCR'd instead
+POPPLER_TIMEOUT = 120
+XHTML = "{http://www.w3.org/1999/xhtml}"  # Namespace of pdftotext -bbox-layout output
+DIRT_MARKER = "on the dirt"  # Only pages with this phrase hold dirt races
+
 # ------------------ OCR Helpers ------------------
 
 def fuzzy_match(a: str, b: str, threshold: float = 0.9) -> bool:
     return SequenceMatcher(None, a, b).ratio() >= threshold
 
-def find_phrase_on_page(page, phrase, threshold=0.9):
+class PageWords:
+    """The words of one page with their boxes and line numbers
+
+    Built from a single image_to_data pass (or the PDF's text layer, in
+    the same shape), it answers the dirt filter and every phrase lookup
+    for the page, so Tesseract runs at most once per page.
+    """
+
+    def __init__(self, data):
+        self.words, self.tops, self.bottoms, self.line_numbers = [], [], [], []
+        lines = {}  # (block, paragraph, line) -> line number
+        line_words = []
+        for text, top, height, block, par, line in zip(data['text'], data['top'], data['height'],
+                                                       data['block_num'], data['par_num'], data['line_num']):
+            text = str(text).strip().lower()
+            if not text:
+                continue  # Page, block, paragraph and line rows carry no text
+            line_number = lines.setdefault((block, par, line), len(lines))
+            if line_number == len(line_words):
+                line_words.append([])
+            line_words[line_number].append(text)
+            self.words.append(text)
+            self.tops.append(top)
+            self.bottoms.append(top + height)
+            self.line_numbers.append(line_number)
+        self.lines = [" ".join(words) for words in line_words]
+        self.text = "\n".join(self.lines)
+
+    def contains(self, phrase):
+        return phrase.lower() in self.text
+
+    def find(self, phrase, threshold=0.9):
+        """(top, bottom) of the first run of words fuzzily matching `phrase`, or None"""
+        phrase = phrase.lower()
+        n = len(phrase.split())
+        for i in range(len(self.words) - n + 1):
+            if fuzzy_match(" ".join(self.words[i:i + n]), phrase, threshold):
+                return min(self.tops[i:i + n]), max(self.bottoms[i:i + n])
+        return None
+
+def ocr_page(page):
+    """PageWords of one page image, or None when OCR fails"""
     try:
-        data = pytesseract.image_to_data(page, output_type=pytesseract.Output.DICT)
-        words = [w.lower() for w in data['text']]
-        tgt_words = phrase.lower().split()
-        n = len(tgt_words)
-
-        for i in range(len(words) - n + 1):
-            candidate = " ".join(words[i:i + n])
-            if fuzzy_match(candidate, phrase.lower(), threshold):
-                tops = data['top'][i:i + n]
-                heights = data['height'][i:i + n]
-                return min(tops), max(t + h for t, h in zip(tops, heights))
+        return PageWords(pytesseract.image_to_data(page, output_type=pytesseract.Output.DICT))
     except Exception as e:
-        print(f"❌ OCR error on page finding '{phrase}': {e}")
+        print(f"❌ OCR error on page: {e}")
         traceback.print_exc()
     return None
 
-def find_all_segments_on_pages(pages, start_phrase, end_phrase, threshold=0.9):
+def find_phrase_on_page(page, phrase, threshold=0.9):
+    # `page` is an image, or the PageWords of one so it is not OCR'd again
+    words = page if isinstance(page, PageWords) else ocr_page(page)
+    return words.find(phrase, threshold) if words is not None else None
+
+def find_all_segments_on_pages(pages, start_phrase, end_phrase, threshold=0.9, page_words=None):
+    """Segments between the phrases on dirt pages; pass `page_words` to reuse the pages' OCR"""
     segments = []
+    if page_words is None:
+        page_words = [ocr_page(page) for page in pages]
 
-    for pi, page in enumerate(pages):
-        try:
-            # 🧠 OCR the page to extract raw text first
-            page_text = pytesseract.image_to_string(page).lower().strip()
-        except Exception as e:
-            print(f"❌ OCR text extraction failed on page {pi}: {e}")
+    for pi, words in enumerate(page_words):
+        if words is None:
             continue
 
         # Step 1: Does page contain "on the dirt"?
-        if "on the dirt" not in page_text:
+        if not words.contains(DIRT_MARKER):
             continue  # Skip this page
 
         # Step 2: Find start phrase on this page
-        start_res = find_phrase_on_page(page, start_phrase, threshold)
+        start_res = words.find(start_phrase, threshold)
         if not start_res:
             continue
 
         # Step 3: Find end phrase on this page, after start
-        end_res = find_phrase_on_page(page, end_phrase, threshold)
+        end_res = words.find(end_phrase, threshold)
         if not end_res:
             continue
 
@@ -75,56 +131,184 @@ def find_all_segments_on_pages(pages, start_phrase, end_phrase, threshold=0.9):
 
 # ------------------ Image Cropping ------------------
 
+def segment_strips(page_sizes, start_page, start_y, end_page, end_y, padding=20):
+    """(page index, y0, y1) of the strip each page adds to a segment, with `padding` around it"""
+    strips = []
+    for idx in range(start_page, end_page + 1):
+        _, H = page_sizes[idx]
+        if idx == start_page == end_page:
+            y0, y1 = max(0, start_y - padding), min(H, end_y + padding)
+        elif idx == start_page:
+            y0, y1 = max(0, start_y - padding), H
+        elif idx == end_page:
+            y0, y1 = 0, min(H, end_y + padding)
+        else:
+            y0, y1 = 0, H
+        strips.append((idx, y0, y1))
+    return strips
+
+def save_stitched(crops, basename, out_folder, seg_index):
+    W = crops[0].size[0]
+    total_h = sum(c.size[1] for c in crops)
+    stitched = Image.new("RGB", (W, total_h), "white")
+    off = 0
+    for c in crops:
+        stitched.paste(c, (0, off))
+        off += c.size[1]
+
+    out_name = f"{basename}_race_{seg_index}.png"
+    out_path = os.path.join(out_folder, out_name)
+    stitched.save(out_path, dpi=(PDF_DPI, PDF_DPI))
+    print(f"✅ Saved: {out_name}")
+
 def crop_segment(pages, basename, out_folder, seg_index,
                  start_page, start_y, end_page, end_y,
                  padding=20):
     try:
-        crops = []
         W = pages[0].size[0]
-        for idx in range(start_page, end_page + 1):
-            page = pages[idx]
-            _, H = page.size
-            if idx == start_page == end_page:
-                y0, y1 = max(0, start_y - padding), min(H, end_y + padding)
-            elif idx == start_page:
-                y0, y1 = max(0, start_y - padding), H
-            elif idx == end_page:
-                y0, y1 = 0, min(H, end_y + padding)
-            else:
-                y0, y1 = 0, H
-            crops.append(page.crop((0, y0, W, y1)))
-
-        total_h = sum(c.size[1] for c in crops)
-        stitched = Image.new("RGB", (W, total_h), "white")
-        off = 0
-        for c in crops:
-            stitched.paste(c, (0, off))
-            off += c.size[1]
-
-        out_name = f"{basename}_race_{seg_index}.png"
-        out_path = os.path.join(out_folder, out_name)
-        stitched.save(out_path, dpi=(300, 300))
-        print(f"✅ Saved: {out_name}")
+        strips = segment_strips([page.size for page in pages], start_page, start_y, end_page, end_y, padding)
+        save_stitched([pages[idx].crop((0, y0, W, y1)) for idx, y0, y1 in strips], basename, out_folder, seg_index)
     except Exception as e:
         print(f"❌ Error saving cropped image for {basename} segment {seg_index}: {e}")
         traceback.print_exc()
 
-def process_multiple_segments(pdf_path, out_folder, segment_specs):
-    os.makedirs(out_folder, exist_ok=True)
-    basename = Path(pdf_path).stem
-
+def rasterize_pdf(pdf_path, first_page=None, last_page=None):
     try:
-        pages = convert_from_path(pdf_path, dpi=300, poppler_path=poppler_path)
+        return convert_from_path(pdf_path, dpi=PDF_DPI, poppler_path=poppler_path,
+                                 first_page=first_page, last_page=last_page)
     except Exception as e:
         print(f"❌ Failed to convert {pdf_path} to images: {e}")
         traceback.print_exc()
-        return
+        return None
+
+def rasterize_region(pdf_path, page_index, y0, y1, width):
+    """Rows y0..y1 of one page at PDF_DPI, rendered by pdftoppm without the rest of the page"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "region")
+        subprocess.run([poppler_tool("pdftoppm"), "-f", str(page_index + 1), "-l", str(page_index + 1),
+                        "-r", str(PDF_DPI), "-x", "0", "-y", str(y0), "-W", str(width), "-H", str(y1 - y0),
+                        "-png", "-singlefile", pdf_path, root],
+                       check=True, capture_output=True, timeout=POPPLER_TIMEOUT)
+        with Image.open(f"{root}.png") as region:
+            return region.convert("RGB")
+
+def crop_region_segment(pdf_path, page_sizes, basename, out_folder, seg_index,
+                        start_page, start_y, end_page, end_y,
+                        padding=20):
+    """crop_segment for a PDF on disk: only the strips of the segment are rasterized"""
+    try:
+        W = page_sizes[0][0]
+        strips = segment_strips(page_sizes, start_page, start_y, end_page, end_y, padding)
+        crops = []
+        for idx, y0, y1 in strips:
+            try:
+                crops.append(rasterize_region(pdf_path, idx, y0, y1, W))
+            except Exception as e:
+                print(f"⚠️ Region rendering failed on page {idx} of {basename}, rasterizing the page: {e}")
+                page = rasterize_pdf(pdf_path, idx + 1, idx + 1)[0]
+                crops.append(page.crop((0, y0, W, y1)))
+        save_stitched(crops, basename, out_folder, seg_index)
+    except Exception as e:
+        print(f"❌ Error saving cropped image for {basename} segment {seg_index}: {e}")
+        traceback.print_exc()
+
+# ------------------ PDF Text Layer ------------------
+
+def poppler_tool(name):
+    return os.path.join(poppler_path, name) if poppler_path else name
 
+def _pixels(points, rounding=math.ceil):
+    # Multiply before dividing so whole-point sizes stay exact: 792 pt -> 3300 px, not 3301
+    return rounding(float(points) * PDF_DPI / 72)
+
+def text_layer_words(pdf_path):
+    """[(PageWords or None, (width, height))] per page from the PDF's text layer, in PDF_DPI pixels
+
+    Read with `pdftotext -bbox-layout`, whose words come with boxes in
+    points, grouped in blocks and lines like Tesseract's. A page with fewer
+    than MIN_TEXT_WORDS words (a scan) gets None. Returns None when
+    pdftotext fails.
+    """
+    try:
+        result = subprocess.run([poppler_tool("pdftotext"), "-bbox-layout", "-enc", "UTF-8", pdf_path, "-"],
+                                check=True, capture_output=True, timeout=POPPLER_TIMEOUT)
+        doc = ElementTree.fromstring(result.stdout)
+    except Exception as e:
+        print(f"⚠️ No text layer read from {pdf_path}, falling back to OCR: {e}")
+        return None
+
+    pages = []
+    for page in doc.iter(f"{XHTML}page"):
+        data = {'text': [], 'top': [], 'height': [], 'block_num': [], 'par_num': [], 'line_num': []}
+        for block_num, block in enumerate(page.iter(f"{XHTML}block")):
+            for line_num, line in enumerate(block.iter(f"{XHTML}line")):
+                for word in line.iter(f"{XHTML}word"):
+                    # Widen to whole pixels so the box still covers the word
+                    top = _pixels(word.get('yMin'), math.floor)
+                    data['text'].append(word.text or "")
+                    data['top'].append(top)
+                    data['height'].append(_pixels(word.get('yMax')) - top)
+                    data['block_num'].append(block_num)
+                    data['par_num'].append(0)
+                    data['line_num'].append(line_num)
+        # Rounded up like pdftoppm, so strips line up with its renders
+        size = (_pixels(page.get('width')), _pixels(page.get('height')))
+        words = PageWords(data)
+        pages.append((words if len(words.words) >= MIN_TEXT_WORDS else None, size))
+    return pages
+
+def read_pdf_pages(pdf_path):
+    """PageWords and pixel size of every page: from the text layer, OCR only for pages without one"""
+    text_pages = text_layer_words(pdf_path)
+    if text_pages is None:
+        pages = rasterize_pdf(pdf_path)
+        if pages is None:
+            return None
+        return [ocr_page(page) for page in pages], [page.size for page in pages]
+
+    page_words, page_sizes = [], []
+    for idx, (words, size) in enumerate(text_pages):
+        if words is None:
+            page = rasterize_pdf(pdf_path, idx + 1, idx + 1)
+            words = ocr_page(page[0]) if page else None
+            if page:
+                if page[0].size != size:
+                    print(f"⚠️ {Path(pdf_path).stem} page {idx + 1}: text layer size {size}, "
+                          f"pdftoppm rendered {page[0].size}")
+                size = page[0].size
+        page_words.append(words)
+        page_sizes.append(size)
+    scanned = sum(1 for words, _ in text_pages if words is None)
+    if scanned:
+        print(f"⚠️ {Path(pdf_path).stem}: {scanned} of {len(text_pages)} pages without a text layer were OCR'd")
+    return page_words, page_sizes
+
+def check_page_sizes(pdf_path):
+    """Compare text_layer_words' page sizes with pdftoppm's renders of the same PDF"""
+    text_pages = text_layer_words(pdf_path)
+    pages = rasterize_pdf(pdf_path)
+    if text_pages is None or pages is None:
+        return False
+    if len(text_pages) != len(pages):
+        print(f"❌ {pdf_path}: {len(text_pages)} pages in the text layer, {len(pages)} rendered")
+        return False
+    mismatched = [(idx + 1, size, page.size) for idx, ((_, size), page) in enumerate(zip(text_pages, pages))
+                  if size != page.size]
+    for page_number, size, rendered in mismatched:
+        print(f"❌ {pdf_path} page {page_number}: text layer size {size}, pdftoppm rendered {rendered}")
+    if not mismatched:
+        print(f"✅ {pdf_path}: {len(pages)} page sizes match pdftoppm")
+    return not mismatched
+
+def find_pdf_segments(page_words, basename, segment_specs):
+    """[(spec, segments)] for every spec with segments on the indexed pages"""
+    found = []
     for spec in segment_specs:
         try:
             segments = find_all_segments_on_pages(
-                pages, spec['start'], spec['end'],
-                threshold=spec.get('threshold', 0.9)
+                None, spec['start'], spec['end'],
+                threshold=spec.get('threshold', 0.9),
+                page_words=page_words
             )
         except Exception as e:
             print(f"❌ Error finding segments in {basename}: {e}")
@@ -135,13 +319,138 @@ def process_multiple_segments(pdf_path, out_folder, segment_specs):
             print(f"⚠️ No segments found for {basename} with phrases "
                   f"'{spec['start']}' → '{spec['end']}'")
             continue
+        found.append((spec, segments))
+    return found
 
+def process_multiple_segments(pdf_path, out_folder, segment_specs):
+    located = locate_pdf_segments(pdf_path, segment_specs)
+    if located is not None:
+        crop_pdf_segments(located, out_folder)
+
+# ------------------ Pipeline ------------------
+
+def locate_pdf_segments(pdf_path, segment_specs):
+    """Locate stage: (pdf_path, found segments, page sizes), or None when there are none
+
+    Pages are read from the PDF's text layer; only pages without one are
+    rasterized and OCR'd.
+    """
+    pages = read_pdf_pages(pdf_path)
+    if pages is None:
+        return None
+    page_words, page_sizes = pages
+    found = find_pdf_segments(page_words, Path(pdf_path).stem, segment_specs)
+    return (pdf_path, found, page_sizes) if found else None
+
+def crop_pdf_segments(located, out_folder):
+    """Crop + encode stage: rasterize only the strips the segments cover, then stitch and save"""
+    pdf_path, found, page_sizes = located
+    basename = Path(pdf_path).stem
+    os.makedirs(out_folder, exist_ok=True)
+    for spec, segments in found:
         for idx, (si, sy, ei, ey) in enumerate(segments, start=1):
-            crop_segment(
-                pages, basename, out_folder, idx,
+            crop_region_segment(
+                pdf_path, page_sizes, basename, out_folder, idx,
                 si, sy, ei, ey,
                 padding=spec.get('padding', 20)
             )
+    return sum(len(segments) for _, segments in found)
+
+_END = object()  # Tells a stage's worker thread its input is exhausted
+
+class PipelineStage:
+    """Worker threads taking items from a bounded inbox, with throughput counters
+
+    `fn(item)` runs in the thread, or in `pool` when given, so each thread
+    keeps one of the pool's processes busy. Results other than None go to
+    the next stage's inbox; a full inbox blocks this stage until the next
+    one catches up, so no stage runs far ahead of the slowest.
+    """
+
+    def __init__(self, name, fn, workers, pool=None, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.fn = fn
+        self.pool = pool
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.threads = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+                        for i in range(workers)]
+        self.lock = threading.Lock()
+        self.done = self.passed = self.failed = 0
+        self.busy = self.starved = self.blocked = 0.0  # Thread-seconds working, waiting for input, waiting on output
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            waiting = time.monotonic()
+            item = self.inbox.get()
+            if item is _END:
+                return
+            started = time.monotonic()
+            failed = False
+            try:
+                result = self.pool.submit(self.fn, item).result() if self.pool else self.fn(item)
+            except Exception as e:
+                print(f"❌ {self.name} stage failed on {item}: {e}")
+                result, failed = None, True
+            finished = time.monotonic()
+            if result is not None and self.next is not None:
+                self.next.inbox.put(result)
+            with self.lock:
+                self.starved += started - waiting
+                self.busy += finished - started
+                self.blocked += time.monotonic() - finished
+                self.done += 1
+                self.passed += result is not None
+                self.failed += failed
+
+    def finish(self):
+        """Wait for the items already queued, then stop the workers"""
+        for _ in self.threads:
+            self.inbox.put(_END)
+        for thread in self.threads:
+            thread.join()
+
+    def report(self):
+        with self.lock:
+            wall = max(time.monotonic() - self.started, 1e-9)
+            thread_seconds = wall * len(self.threads)
+            return (f"{self.name}: {self.done} done, {self.passed} passed on, {self.failed} failed, "
+                    f"{self.done / wall * 60:.1f}/min, {self.busy / thread_seconds:.0%} busy, "
+                    f"{self.starved / thread_seconds:.0%} waiting for input, "
+                    f"{self.blocked / thread_seconds:.0%} blocked by the next stage")
+
+def run_pipeline(stages, items, report_seconds=REPORT_SECONDS):
+    """Feed `items` through `stages` in order and print each stage's counters as it runs"""
+    for stage, next_stage in zip(stages, stages[1:]):
+        stage.next = next_stage
+    for stage in stages:
+        stage.start()
+
+    stop = threading.Event()
+
+    def _report():
+        while not stop.wait(report_seconds):
+            print("📊 " + " | ".join(stage.report() for stage in stages))
+
+    reporter = threading.Thread(target=_report, daemon=True)
+    reporter.start()
+    try:
+        for item in items:
+            stages[0].inbox.put(item)  # Blocks while the first stage is full
+        # Each stage has passed on everything before the next one is told to stop
+        for stage in stages:
+            stage.finish()
+    finally:
+        stop.set()
+    print("📊 Pipeline finished")
+    for stage in stages:
+        print("   " + stage.report())
 
 # ------------------ Download & CSV ------------------
 
@@ -167,35 +476,49 @@ def download_pdf(url, save_path):
         traceback.print_exc()
     return False
 
+def download_row(indexed_row, download_dir):
+    """Download stage: the PDF's path, or None when it could not be downloaded"""
+    index, row = indexed_row
+    try:
+        track = row['track_name'].replace(" ", "_")
+        date = row['date']
+        base_name = f"{track}_{date}"
+        pdf_url = row['pdf_url']
+        pdf_path = os.path.join(download_dir, f"{base_name}.pdf")
+
+        if download_pdf(pdf_url, pdf_path):
+            return pdf_path
+    except Exception as e:
+        print(f"❌ Error processing row {index} ({row.get('pdf_url')}): {e}")
+        traceback.print_exc()
+    return None
+
 def process_csv_and_download(csv_file, download_dir, output_dir,
-                             segment_specs, max_workers=None):
+                             segment_specs, max_workers=None,
+                             ocr_workers=OCR_WORKERS, crop_workers=CROP_WORKERS,
+                             queue_size=QUEUE_SIZE):
+    """Download every PDF in the CSV and crop its segments, each step in its own pool
+
+    `max_workers` download threads feed `ocr_workers` processes locating
+    the segments, which feed `crop_workers` crop + encode processes, through
+    queues of `queue_size`. A slow download no longer holds an OCR slot,
+    and cropping no longer competes with OCR for one Python thread.
+    """
     os.makedirs(download_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
     df = pd.read_csv(csv_file)
 
-    def _process_row(index, row):
-        try:
-            track = row['track_name'].replace(" ", "_")
-            date = row['date']
-            base_name = f"{track}_{date}"
-            pdf_url = row['pdf_url']
-            pdf_path = os.path.join(download_dir, f"{base_name}.pdf")
-
-            if download_pdf(pdf_url, pdf_path):
-                process_multiple_segments(pdf_path, output_dir, segment_specs)
-        except Exception as e:
-            print(f"❌ Error processing row {index} ({row.get('pdf_url')}): {e}")
-            traceback.print_exc()
-
-    # default threads = cpu_count or fallback to 4
-    workers = max_workers or (os.cpu_count() or 4)
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {
-            executor.submit(_process_row, idx, row): idx
-            for idx, row in df.iterrows()
-        }
-        for future in as_completed(futures):
-            # any exception in _process_row is already caught, so this is just to drain
-            pass
+    with ProcessPoolExecutor(max_workers=ocr_workers) as ocr_pool, \
+            ProcessPoolExecutor(max_workers=crop_workers) as crop_pool:
+        stages = [
+            PipelineStage("download", partial(download_row, download_dir=download_dir),
+                          max_workers or DOWNLOAD_WORKERS, queue_size=queue_size),
+            PipelineStage("locate", partial(locate_pdf_segments, segment_specs=segment_specs),
+                          ocr_workers, pool=ocr_pool, queue_size=queue_size),
+            PipelineStage("crop", partial(crop_pdf_segments, out_folder=output_dir),
+                          crop_workers, pool=crop_pool, queue_size=queue_size),
+        ]
+        run_pipeline(stages, df.iterrows())
 
 def group_images_by_segment(src_folder):
     try:
@@ -219,6 +542,13 @@ def group_images_by_segment(src_folder):
 # ------------------ Run ------------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download race chart PDFs and crop their dirt race tables.")
+    parser.add_argument('--check-sizes', nargs='+', metavar='PDF',
+                        help="only check that the text layer's page sizes match pdftoppm's renders of these PDFs")
+    args = parser.parse_args()
+    if args.check_sizes:
+        raise SystemExit(0 if all([check_page_sizes(pdf) for pdf in args.check_sizes]) else 1)
+
     segment_specs = [
         {
             'start': 'Last Raced',
@@ -0,0 +1,192 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from race_store import POSITION_COLS, parse_race_dates
+
+HORSE_INDEX_PATH = 'horse_index.pkl'
+RECORD_COLS = (['horse_name', 'track_name', 'date', 'race_number', 'pp'] + POSITION_COLS
+               + ['odds', 'comments'])
+RECENT_STARTS = 3
+
+def normalize_horse_name(names):
+    """Lower-case names with single spaces, the key every lookup uses."""
+    return names.astype(str).str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+
+def _as_records(df):
+    records = df.reindex(columns=RECORD_COLS).dropna(subset=['horse_name', 'track_name'])
+    if not pd.api.types.is_datetime64_any_dtype(records['date']):
+        records['date'] = parse_race_dates(records['date'])
+    records['date'] = records['date'].astype('datetime64[ns]')
+    for col in ['race_number', 'pp'] + POSITION_COLS:
+        records[col] = pd.to_numeric(records[col], errors='coerce').astype('Int8')
+    records['odds'] = pd.to_numeric(records['odds'], errors='coerce')
+    for col in ['horse_name', 'track_name', 'comments']:
+        # Arrow strings: a few bytes per start instead of a Python object each
+        records[col] = records[col].astype('string[pyarrow]')
+    return records.dropna(subset=['date']).reset_index(drop=True)
+
+def _day_fingerprints(records):
+    """(track, date) -> (row count, sum of row hashes) of each chart in `records`.
+
+    Both parts add up, so the pieces of a chart split across chunks sum to
+    the fingerprint of the whole chart.
+    """
+    codes, days = pd.MultiIndex.from_arrays([records['track_name'], records['date']]).factorize()
+    hashes = np.zeros(len(days), dtype=np.uint64)
+    np.add.at(hashes, codes, pd.util.hash_pandas_object(records, index=False).to_numpy())
+    counts = np.bincount(codes, minlength=len(days))
+    return {day: (int(count), int(value)) for day, count, value in zip(days, counts, hashes)}
+
+def _start_keys(records):
+    """One sortable int64 per start: the race date, then the race number."""
+    race_number = records['race_number'].fillna(0).to_numpy(dtype=np.int64)
+    return records['date'].to_numpy().astype(np.int64) + race_number
+
+class HorseIndex:
+    """Every past start of every horse, with offsets grouped by horse.
+
+    `records` holds one compact row per start in the order it was added and
+    `offsets` maps a normalized name to the positions of that horse's starts,
+    oldest first. A lookup is one dict access plus a slice, and new charts
+    are appended without touching the horses they do not mention.
+    """
+
+    def __init__(self):
+        self._parts = [_as_records(pd.DataFrame(columns=RECORD_COLS))]
+        self.keys = np.empty(0, dtype=np.int64)
+        self.offsets = {}  # normalized name -> int64 array of record positions
+        self.days = set()  # (track, date) charts already indexed
+        self.fingerprints = {}  # (track, date) -> _day_fingerprints of the indexed rows
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def records(self):
+        # Appended blocks are joined on first read, not on every append
+        if len(self._parts) > 1:
+            self._parts = [pd.concat(self._parts, ignore_index=True)]
+        return self._parts[0]
+
+    def add_races(self, df, keep_days=frozenset()):
+        """Index cleaned chart rows and return their (track, date) charts.
+
+        Charts already indexed with the same rows are skipped, so a run over
+        the whole history only appends what is new. Charts whose rows
+        changed are replaced, except those in `keep_days`, which a chunked
+        run passes so a chart split across chunks adds up.
+        """
+        new = _as_records(df)
+        if new.empty:
+            return set()
+        fingerprints = _day_fingerprints(new)
+        unchanged = {day for day, fingerprint in fingerprints.items()
+                     if day not in keep_days and self.fingerprints.get(day) == fingerprint}
+        if unchanged:
+            chart = pd.MultiIndex.from_arrays([new['track_name'], new['date']])
+            new = new[~chart.isin(list(unchanged))].reset_index(drop=True)
+            if new.empty:
+                return unchanged
+        new_days = set(zip(new['track_name'], new['date']))
+        if (new_days & self.days) - keep_days:
+            self._drop_days((new_days & self.days) - keep_days)
+        for day in new_days:
+            count, value = fingerprints[day]
+            if day in keep_days and day in self.fingerprints:
+                count, value = (count + self.fingerprints[day][0],
+                                (value + self.fingerprints[day][1]) % 2 ** 64)
+            self.fingerprints[day] = (count, value)
+
+        start = len(self.keys)
+        self._parts.append(new)
+        self.keys = np.concatenate([self.keys, _start_keys(new)])
+        self.days |= new_days
+
+        names = normalize_horse_name(new['horse_name'])
+        for name, rows in names.groupby(names, sort=False).indices.items():
+            positions = rows.astype(np.int64) + start
+            if name in self.offsets:
+                positions = np.concatenate([self.offsets[name], positions])
+            keys = self.keys[positions]
+            if (keys[1:] < keys[:-1]).any():
+                positions = positions[np.argsort(keys, kind='stable')]
+            self.offsets[name] = positions
+        return new_days | unchanged
+
+    def remove_days(self, days):
+        """Forget the indexed charts in `days`, e.g. race days no longer in the raw store."""
+        days = set(days) & self.days
+        if days:
+            self._drop_days(days)
+
+    def _drop_days(self, days):
+        """Remove whole charts, then regroup the remaining starts."""
+        chart = pd.MultiIndex.from_arrays([self.records['track_name'], self.records['date']])
+        keep = ~chart.isin(list(days))
+        self._parts = [self.records[keep].reset_index(drop=True)]
+        self.keys = self.keys[keep]
+        self.days -= days
+        for day in days:
+            self.fingerprints.pop(day, None)
+
+        order = np.argsort(self.keys, kind='stable')
+        names = normalize_horse_name(self.records['horse_name']).to_numpy()[order]
+        self.offsets = {name: order[rows] for name, rows in
+                        pd.Series(names).groupby(names, sort=False).indices.items()}
+
+    def last_starts(self, horse, n=10):
+        """The horse's last `n` starts, newest first (empty when unknown)."""
+        positions = self.offsets.get(normalize_horse_name(pd.Series([horse]))[0])
+        if positions is None:
+            return self.records.iloc[:0]
+        return self.records.iloc[positions[::-1][:n]]
+
+    def recent_form(self, horses, n=RECENT_STARTS):
+        """Start count, last finishes and last race date for each name in `horses`."""
+        fins = self.records['fin'].to_numpy(dtype=float, na_value=np.nan)
+        dates = self.records['date'].to_numpy()
+        starts, last_fins, last_dates = [], [], []
+        for name in normalize_horse_name(pd.Series(horses, dtype=object)):
+            positions = self.offsets.get(name)
+            if positions is None:
+                starts.append(0)
+                last_fins.append('')
+                last_dates.append(pd.NaT)
+                continue
+            recent = positions[::-1][:n]
+            starts.append(len(positions))
+            last_fins.append('-'.join('?' if np.isnan(f) else str(int(f)) for f in fins[recent]))
+            last_dates.append(dates[recent[0]])
+        return pd.DataFrame({'starts': starts, 'last_fins': last_fins, 'last_start': last_dates})
+
+def add_recent_form(df, index, n=RECENT_STARTS, name_col='horse_name'):
+    """Append starts / last_fins / last_start columns for the horses in `df`."""
+    if df.empty:
+        return df
+    form = index.recent_form(df[name_col], n)
+    return pd.concat([df.reset_index(drop=True), form], axis=1)
+
+def load_horse_index(path=HORSE_INDEX_PATH):
+    if not os.path.exists(path):
+        return HorseIndex()
+    index = pd.read_pickle(path)
+    if not hasattr(index, 'fingerprints'):
+        index.fingerprints = {}  # Saved before fingerprints: the next run re-indexes every chart once
+    return index
+
+def save_horse_index(index, path=HORSE_INDEX_PATH):
+    pd.to_pickle(index, path)
+
+if __name__ == "__main__":
+    # Past performances, e.g. python horse_index.py "Drill Baby Drill"
+    index = load_horse_index()
+    print(f"{len(index)} starts of {len(index.offsets)} horses indexed")
+    for horse in sys.argv[1:]:
+        starts = index.last_starts(horse)
+        if starts.empty:
+            print(f"⚠️ No starts indexed for {horse}")
+            continue
+        print(f"\n{horse}\n", starts.drop(columns='horse_name').to_string(index=False))
@@ -0,0 +1,69 @@
+import argparse
+
+import pandas as pd
+
+from getting_excel import collect_race_records, save_race_records, folder_path
+from cleaning import clean_races, save_cleaned_races, load_parse_cache, save_parse_cache
+from Caculation import (compact_races, run_bias_detection, save_bias_outputs,
+                        load_bias_store)
+from getting_today_bias_horse import fuzzy_match_horses, excel_file
+from horse_index import add_recent_form, load_horse_index
+
+def run_pipeline(json_folder=folder_path, today_horses=None, workers=1, write_files=False,
+                 store=None):
+    """Run JSON ingestion, cleaning, bias detection and today's matching in memory.
+
+    `today_horses` is the scraped entries frame (column 'Horse'); matching is
+    skipped without it. Returns a dict of DataFrames keyed by stage output.
+    Files (and the persisted bias store) are only touched with `write_files=True`.
+    """
+    raw = collect_race_records(json_folder)
+    cache = load_parse_cache() if write_files else None
+    cleaned = clean_races(raw, cache)
+
+    if write_files and store is None:
+        store = load_bias_store()
+    races = compact_races(cleaned.copy())
+    results = run_bias_detection(races, store, workers=workers)
+    store, dirty, speed_bias_closers, post_bias_outperformers, bias_days = results
+
+    bets = None
+    if today_horses is not None and not post_bias_outperformers.empty:
+        # Past starts from earlier runs too; only this run's new or changed charts are added
+        horses = load_horse_index()
+        horses.add_races(cleaned)
+        bets = add_recent_form(fuzzy_match_horses(post_bias_outperformers, today_horses), horses)
+
+    if write_files:
+        save_race_records(raw)
+        save_parse_cache(cache)
+        save_cleaned_races(cleaned, full=True)  # The JSON folder holds every race day
+        save_bias_outputs(*results)
+        if bets is not None:
+            bets.to_csv('getting_data_to_bet_today_horses.csv', index=False)
+
+    return {
+        'raw': raw,
+        'cleaned': cleaned,
+        'speed_bias_closers': speed_bias_closers,
+        'post_bias_outperformers': post_bias_outperformers,
+        'bias_days': pd.DataFrame(bias_days),
+        'bets': bets,
+        'store': store,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the chart pipeline in one process.")
+    parser.add_argument('--json-folder', default=folder_path)
+    parser.add_argument('--today', default=excel_file,
+                        help="today's entries workbook from getting_today's_horse_data.py")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--write', action='store_true',
+                        help="also write the usual xlsx/csv/Parquet outputs and the bias store")
+    args = parser.parse_args()
+
+    today = pd.read_excel(args.today) if args.today else None
+    outputs = run_pipeline(args.json_folder, today, workers=args.workers, write_files=args.write)
+    for name, frame in outputs.items():
+        if isinstance(frame, pd.DataFrame):
+            print(f"{name:<24} {len(frame):>8} rows")
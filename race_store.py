@@ -0,0 +1,212 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Parquet datasets shared by the pipeline stages, partitioned by track and date
+RAW_STORE = "race_data_raw"    # getting_excel.py -> cleaning.py
+CLEAN_STORE = "race_data"      # cleaning.py -> Caculation.py
+
+POSITION_COLS = ['start', 'quarter', 'half', 'three_quarter', 'str', 'fin']
+# Beaten lengths behind the leader at each call, added by cleaning.py
+LENGTH_COLS = [f'{col}_lengths' for col in POSITION_COLS]
+TEXT_COLS = ['last_raced', 'pgm', 'horse_name', 'wgt_me', 'comments']
+CATEGORY_COLS = ['track_name', 'jockey']
+
+MAX_PARTITIONS = 1_000_000  # pyarrow stops at 1024 (track, date) partitions per write by default
+MERGE_FILES = 500  # Per-file tables combined into one while reading, see _read_files
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('track_name', pa.string()), ('date', pa.date32())]),
+    flavor='hive',
+)
+
+# Column order of the chart tables, as written to cleaned_file.csv
+RACE_COLS = ['last_raced', 'pgm', 'horse_name', 'jockey', 'wgt_me', 'pp',
+             'start', 'quarter', 'half', 'three_quarter', 'str', 'fin',
+             'odds', 'comments', 'track_name', 'date', 'race_number']
+KEY_TYPES = {'date': pa.date32(), 'race_number': pa.int16()}
+
+# Rows as extracted from the chart images: positions keep their superscripts
+RAW_SCHEMA = pa.schema([(col, KEY_TYPES.get(col, pa.string())) for col in RACE_COLS])
+
+# Rows after cleaning.py: small integer positions, float odds, real dates
+CLEAN_TYPES = dict(KEY_TYPES, pp=pa.int8(), odds=pa.float64(),
+                   **{col: pa.int8() for col in POSITION_COLS},
+                   **{col: pa.float32() for col in LENGTH_COLS})
+CLEAN_SCHEMA = pa.schema([(col, CLEAN_TYPES.get(col, pa.string())) for col in RACE_COLS + LENGTH_COLS])
+
+def parse_race_dates(dates):
+    """Parse the DD-MM-YYYY dates used in chart file names."""
+    return pd.to_datetime(dates, dayfirst=True, errors='coerce')
+
+def _as_text(values):
+    return values.astype('string').astype(object).where(values.notna(), None)
+
+def to_raw_frame(df):
+    """Coerce freshly extracted records to RAW_SCHEMA column types."""
+    df = df.copy()
+    for col in RACE_COLS[:-2]:
+        if col not in df:
+            df[col] = None
+        df[col] = _as_text(df[col])
+    df['date'] = parse_race_dates(df['date'])
+    df['race_number'] = pd.to_numeric(df['race_number'], errors='coerce').astype('Int16')
+    return df.dropna(subset=['track_name', 'date'])
+
+def to_clean_frame(df):
+    """Coerce cleaned rows to CLEAN_SCHEMA column types."""
+    df = df.copy()
+    for col in TEXT_COLS + ['jockey', 'track_name']:
+        df[col] = _as_text(df[col])
+    for col in ['pp'] + POSITION_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int8')
+    for col in LENGTH_COLS:
+        # Charts cleaned before beaten lengths existed have none
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32') if col in df else np.float32('nan')
+    df['odds'] = pd.to_numeric(df['odds'], errors='coerce')
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = parse_race_dates(df['date'])
+    df['race_number'] = pd.to_numeric(df['race_number'], errors='coerce').astype('Int16')
+    return df.dropna(subset=['track_name', 'date'])
+
+def _write_dataset(data, root):
+    ds.write_dataset(
+        data, root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+        preserve_order=True,
+        # One partition per (track, date), so a full history is thousands of them
+        max_partitions=MAX_PARTITIONS,
+    )
+
+def write_races(df, root, schema):
+    """Write rows into the partitioned dataset at `root`.
+
+    Every (track, date) present in `df` replaces that partition on disk;
+    other partitions are left alone, so a run can write just its new days.
+    """
+    _write_dataset(pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False), root)
+    print(f"✅ Wrote {len(df)} rows to '{root}'")
+
+def write_race_chunks(frames, root, schema):
+    """write_races for an iterable of DataFrames, streamed as one write.
+
+    Only one chunk is held at a time, and a (track, date) spread over several
+    chunks is replaced once rather than by each chunk in turn.
+    """
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        for df in frames:
+            rows += len(df)
+            yield pa.RecordBatch.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+    _write_dataset(pa.RecordBatchReader.from_batches(schema, batches()), root)
+    print(f"✅ Wrote {rows} rows to '{root}'")
+
+def drop_days(root, days):
+    """Delete the (track, date) partitions in `days` from the dataset at `root`."""
+    for track, date in days:
+        day = (ds.field('track_name') == track) & (ds.field('date') == pa.scalar(date.date(), pa.date32()))
+        path = os.path.join(root, PARTITIONING.format(day)[0])
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            print(f"✅ Removed {track} {date:%d-%m-%Y} from '{root}'")
+        try:
+            os.rmdir(os.path.dirname(path))  # the track folder, once its last day is gone
+        except OSError:
+            pass
+
+def race_days(root):
+    """(track, date) of every partition in the dataset at `root`."""
+    if not has_races(root):
+        return set()
+    days = set()
+    for fragment in ds.dataset(root, format='parquet', partitioning=PARTITIONING).get_fragments():
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        days.add((keys['track_name'], pd.Timestamp(keys['date'])))
+    return days
+
+def read_races(root, schema, columns=None, filter=None, strings_to_categorical=False):
+    """Load rows from the dataset at `root` as a pandas DataFrame.
+
+    `columns` prunes what is read and `filter` is a pyarrow expression, e.g.
+    `ds.field('date') >= datetime.date(2025, 7, 1)`; partitions it rules
+    out are not opened. With
+    `strings_to_categorical` every text column comes out as a categorical,
+    dictionary-encoded by Arrow without a string object per row.
+    """
+    dataset = ds.dataset(root, schema=schema, format='parquet', partitioning=PARTITIONING)
+    return _to_frame(_read_files(dataset, schema, columns, filter), strings_to_categorical)
+
+def _read_files(dataset, schema, columns=None, filter=None):
+    """dataset.to_table, one Parquet file at a time.
+
+    The dataset scanner keeps every file's metadata until the scan ends,
+    about 90 KB per (track, date) file, so a store of 6,500 race days
+    peaked near 600 MB for a 40 MB table. Every MERGE_FILES files the
+    small tables are combined, so their memory is reused for the next ones.
+    """
+    names = columns or schema.names
+    key_names = [name for name in PARTITIONING.schema.names if name in names]
+    file_schema = pa.schema([schema.field(name) for name in names if name not in key_names])
+    merged, tables, keys, rows = [], [], [], []
+    for fragment in dataset.get_fragments(filter=filter):
+        with pq.ParquetFile(fragment.path, pre_buffer=False) as parquet_file:
+            stored = set(parquet_file.schema_arrow.names)
+            table = parquet_file.read(columns=[name for name in file_schema.names if name in stored],
+                                      use_threads=False)
+        for field in file_schema:
+            if field.name not in stored:  # Added to the schema after this file was written
+                table = table.append_column(field.name, pa.nulls(table.num_rows, field.type))
+        tables.append(table.select(file_schema.names).cast(file_schema))
+        keys.append(ds.get_partition_keys(fragment.partition_expression))
+        rows.append(table.num_rows)
+        if len(tables) == MERGE_FILES:
+            merged.append(pa.concat_tables(tables).combine_chunks())
+            tables = []
+
+    # Partition keys live in the paths: one value per file, repeated over its rows
+    parts = merged + tables
+    table = pa.concat_tables(parts).combine_chunks() if parts else file_schema.empty_table()
+    del merged, tables, parts
+    file_of_row = pa.array(np.repeat(np.arange(len(keys)), rows))
+    for name in key_names:
+        values = pa.array([file_keys[name] for file_keys in keys], PARTITIONING.schema.field(name).type)
+        table = table.append_column(name, values.take(file_of_row))
+    table = table.select(names)
+    return table.filter(filter) if filter is not None else table
+
+def iter_races(root, schema, chunk_rows, columns=None):
+    """read_races in DataFrames of about `chunk_rows` rows, one partition after another."""
+    dataset = ds.dataset(root, schema=schema, format='parquet', partitioning=PARTITIONING)
+    pending, pending_rows = [], 0
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_rows):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= chunk_rows:
+            yield _to_frame(pa.Table.from_batches(pending))
+            pending, pending_rows = [], 0
+    if pending:
+        yield _to_frame(pa.Table.from_batches(pending))
+
+def _to_frame(table, strings_to_categorical=False):
+    df = table.to_pandas(date_as_object=False, strings_to_categorical=strings_to_categorical)
+    if 'date' in df:
+        df['date'] = df['date'].astype('datetime64[ns]')
+    for col in df:
+        if col in CATEGORY_COLS or isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Sorted categories keep groupby order identical to plain strings
+            df[col] = df[col].astype(pd.CategoricalDtype(sorted(df[col].dropna().unique())))
+    return df
+
+def has_races(root):
+    return os.path.isdir(root) and any(True for _ in os.scandir(root))
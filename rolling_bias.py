@@ -0,0 +1,104 @@
+import os
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOWS = (3, 7, 20)
+ROLLING_INDEX_PATH = 'rolling_bias.pkl'
+
+# Per-day counts taken from Caculation.compute_day_stats
+COUNT_COLS = ['races', 'lead_winners', 'inside_winners', 'closer_winners']
+RATE_COLS = {'lead_win_pct': 'lead_winners', 'inside_win_pct': 'inside_winners',
+             'closer_win_pct': 'closer_winners'}
+
+class RollingBiasIndex:
+    """Running bias counts over each track's last N race days.
+
+    Every track keeps the days of its longest window and one running sum per
+    window. Adding the next race day adds its counts and subtracts the day
+    that falls out of each window, so an update costs O(1) per window.
+    """
+
+    def __init__(self, windows=ROLLING_WINDOWS):
+        self.windows = tuple(sorted(windows))
+        self.days = {}   # track -> deque of (date, counts), oldest first
+        self.sums = {}   # track -> {window: counts}
+
+    def add_day(self, track, date, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        days = self.days.setdefault(track, deque())
+        if days and date <= days[-1][0]:
+            self._correct_day(track, date, counts)
+            return
+
+        days.append((date, counts))
+        sums = self.sums.setdefault(track, {w: np.zeros(len(counts), dtype=np.int64) for w in self.windows})
+        for w in self.windows:
+            sums[w] += counts
+            if len(days) > w:
+                sums[w] -= days[-w - 1][1]
+        if len(days) > self.windows[-1]:
+            days.popleft()
+
+    def _correct_day(self, track, date, counts):
+        """Re-add a day that arrived out of order or was recomputed."""
+        days = self.days[track]
+        if date < days[0][0] and len(days) == self.windows[-1]:
+            return  # older than every window
+        kept = [(d, c) for d, c in days if d != date] + [(date, counts)]
+        kept.sort(key=lambda day: day[0])
+        self.days[track] = deque(kept[-self.windows[-1]:])
+        self.sums[track] = {w: sum((c for _, c in kept[-w:]), np.zeros(len(counts), dtype=np.int64))
+                            for w in self.windows}
+
+    def add_day_stats(self, day_stats):
+        """Feed rows of a compute_day_stats frame, oldest first."""
+        rows = day_stats.sort_values('date', kind='mergesort')
+        counts = rows[COUNT_COLS].to_numpy()
+        for track, date, day_counts in zip(rows['track_name'], rows['date'], counts):
+            self.add_day(track, date, day_counts)
+
+    def query(self, track):
+        """Bias rates of one track for every window, or None if it never raced."""
+        if track not in self.sums:
+            return None
+        n_days = len(self.days[track])
+        result = {}
+        for w, sums in self.sums[track].items():
+            totals = dict(zip(COUNT_COLS, sums.tolist()))
+            races = totals['races']
+            result[w] = {
+                'days': min(w, n_days),
+                'last_date': self.days[track][-1][0],
+                'races': races,
+                **{rate: totals[col] / races if races else np.nan for rate, col in RATE_COLS.items()},
+            }
+        return result
+
+    def to_frame(self):
+        rows = [{'track_name': track, 'window': w, **stats}
+                for track in sorted(self.sums) for w, stats in self.query(track).items()]
+        return pd.DataFrame(rows)
+
+def load_rolling_index(path=ROLLING_INDEX_PATH):
+    if not os.path.exists(path):
+        return RollingBiasIndex()
+    return pd.read_pickle(path)
+
+def save_rolling_index(index, path=ROLLING_INDEX_PATH):
+    pd.to_pickle(index, path)
+
+if __name__ == "__main__":
+    # Quick lookup for today's cards, e.g. python rolling_bias.py "Saratoga" "Del Mar"
+    index = load_rolling_index()
+    for track in sys.argv[1:] or sorted(index.sums):
+        stats = index.query(track)
+        if stats is None:
+            print(f"⚠️ No race days indexed for {track}")
+            continue
+        print(f"\n{track}")
+        for w, s in stats.items():
+            print(f"  last {w:>2} days ({s['days']} run, {s['races']} races): "
+                  f"lead {s['lead_win_pct']:.0%}  inside {s['inside_win_pct']:.0%}  closer {s['closer_win_pct']:.0%}")
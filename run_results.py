@@ -0,0 +1,27 @@
+import json
+import os
+import subprocess
+
+# Results files of benchmarks.py and extraction_harness.py: one JSON list of runs, oldest first
+
+def git_commit():
+    """Short hash of the checked-out commit, or 'unknown' outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def load_runs(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def append_run(path, run, runs=None):
+    """Write `run` after the runs already recorded in `path` (pass them if already loaded)"""
+    if runs is None:
+        runs = load_runs(path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(runs + [run], f, indent=2)
+    print(f"\n✅ Results appended to {path}")
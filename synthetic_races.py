@@ -0,0 +1,152 @@
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from race_store import RACE_COLS
+
+TRACKS = [
+    'Assiniboia Downs', 'Belterra Park', 'Canterbury Park', 'Century Mile', 'Colonial Downs',
+    'Del Mar', 'Ellis Park', 'Emerald Downs', 'Evangeline Downs', 'Fairmount Park',
+    'Finger Lakes', 'Fort Erie', 'Gulfstream Park', 'Hastings Racecourse', 'Hawthorne',
+    'Horseshoe Indianapolis', 'Lone Star Park', 'Los Alamitos', 'Monmouth Park', 'Parx Racing',
+    'Penn National', 'Prairie Meadows', 'Presque Isle Downs', 'Retama Park', 'Saratoga',
+    'Thistledown', 'Woodbine', 'Charles Town', 'Mountaineer', 'Delaware Park',
+]
+TRACK_CODES = ['ASD', 'BTP', 'CBY', 'CMR', 'CNL', 'DMR', 'ELP', 'EMD', 'EVD', 'FMT', 'FL', 'FE',
+               'GP', 'HST', 'HAW', 'IND', 'LS', 'LA', 'MTH', 'PRX', 'PEN', 'PRM', 'PID', 'RET',
+               'SAR', 'TDN', 'WO', 'CT', 'MNR', 'DEL']
+NAME_WORDS = ['Silver', 'Golden', 'Midnight', 'Lucky', 'Royal', 'Wild', 'Quiet', 'Rapid', 'Shadow',
+              'Dancing', 'Iron', 'Crimson', 'Brave', 'Little', 'Secret', 'Thunder', 'Desert',
+              'Northern', 'Candy', 'Storm', 'Magic', 'Rocket', 'Sassy', 'Blue', 'Smart']
+NAME_NOUNS = ['Arrow', 'Dream', 'Legend', 'Ruler', 'Spirit', 'Warrior', 'Kitten', 'Charm', 'Echo',
+              'Harbor', 'Quest', 'Gambler', 'Rose', 'Cat', 'Tiger', 'Bandit', 'Belle', 'Jet',
+              'Prince', 'Lady', 'Comet', 'Express', 'Whisper', 'Honor', 'Ridge']
+JOCKEY_LAST = ['Hernandez', 'Balroop', 'Pruitt', 'Stephenson', 'Whitehall', 'Ortiz', 'Rosario',
+               'Saez', 'Gaffalione', 'Prat', 'Velazquez', 'Castellano', 'Lopez', 'Torres', 'Diaz']
+JOCKEY_FIRST = ['Jann', 'Sven', 'Ciera', 'Neville', 'Antonio', 'Irad', 'Joel', 'Luis', 'Tyler',
+                'Flavien', 'John', 'Javier', 'Paco', 'Eric', 'Carlos']
+COMMENTS = ['stk duel otsd,drftd in', 'stk duel insd,rail rly', 'urged 3/8 all out, up',
+            'rail3/8,4w1/4no rally', 'jostled st,fin well', 'stalked duel otsd', '2nd best',
+            'no factor', 'off slow,mild gain', '3w turn,empty', 'ins,angled out1/4,up', 'tired']
+EQUIPMENT = ['L', 'L b', 'L bf', 'L f', 'b', '']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Beaten-length suffixes as they appear in the raw JSON, e.g. "4²" or "4³ ¹/²"
+MARGINS = ['', '¹', '²', '³', '⁴', '⁶', '¹/²', '³/⁴', '¹/⁴', '¹ ¹/²', '² ¹/²', '³ ¹/²', '¹³', 'ʰᵈ', 'ⁿᵏ', 'ⁿᵒ']
+MAX_FIELD = 12
+CALL_NOISE = {'start': 1.6, 'quarter': 1.2, 'half': 0.9, 'three_quarter': 0.7, 'str': 0.5, 'fin': 0.3}
+FIRST_DAY = date(2025, 1, 1)
+
+def _vocab(values):
+    return np.array(values, dtype=object)
+
+def _positions(race_of_row, row_in_race, keys):
+    """Rank `keys` inside every race, 1 = lowest key."""
+    order = np.lexsort((keys, race_of_row))
+    pos = np.empty(len(keys), dtype=np.int64)
+    pos[order] = row_in_race + 1
+    return pos
+
+def generate_race_rows(n_rows, seed=0, raw=True, first_card=0):
+    """Build `n_rows` chart rows in the cleaned_file.csv schema.
+
+    With `raw=True` the positions are strings with superscript margins like
+    the extracted JSON; otherwise they are the cleaned 1-15 integers.
+    Cards are numbered from `first_card` so consecutive chunks never collide.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Fields of 5-12 starters, cut so the rows add up exactly
+    sizes = rng.integers(5, MAX_FIELD + 1, size=n_rows // 5 + 1)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), n_rows) + 1]
+    sizes[-1] -= sizes.sum() - n_rows
+    n_races = len(sizes)
+    race_of_row = np.repeat(np.arange(n_races), sizes)
+    row_in_race = np.arange(n_rows) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    # 6-12 races per card; every track runs one card a day
+    card_sizes = rng.integers(6, 13, size=n_races // 6 + 1)
+    card_sizes = card_sizes[:np.searchsorted(np.cumsum(card_sizes), n_races) + 1]
+    card_sizes[-1] -= card_sizes.sum() - n_races
+    card_of_race = first_card + np.repeat(np.arange(len(card_sizes)), card_sizes)
+    race_number = np.arange(n_races) - np.repeat(np.cumsum(card_sizes) - card_sizes, card_sizes) + 1
+    track_idx = card_of_race % len(TRACKS)
+    days = np.unique(card_of_race // len(TRACKS))
+    day_strings = _vocab([(FIRST_DAY + timedelta(days=int(d))).strftime('%d-%m-%Y') for d in days])
+    date_of_race = day_strings[np.searchsorted(days, card_of_race // len(TRACKS))]
+    sprint = rng.random(n_races) < 0.35
+
+    # Latent ability drives every call, with less noise nearer the wire
+    ability = rng.normal(size=n_rows)
+    df = {}
+    horse_pool = max(1000, n_rows // 8)
+    horse_ids = rng.integers(0, horse_pool, size=n_rows)
+    name_pool = _vocab([f"{NAME_WORDS[i % 25]} {NAME_NOUNS[(i // 25) % 25]}" + (f" {i // 625}" if i >= 625 else '')
+                        for i in range(horse_pool)])
+    jockeys = _vocab([f"{last}, {first}" for last in JOCKEY_LAST for first in JOCKEY_FIRST])
+    last_raced = _vocab([f"{d:02d}{m}25 '{code}'" for code in TRACK_CODES for m in MONTHS for d in (3, 11, 19, 27)])
+
+    pp = _positions(race_of_row, row_in_race, rng.random(n_rows))
+    df['last_raced'] = last_raced[rng.integers(0, len(last_raced), n_rows)]
+    df['last_raced'][rng.random(n_rows) < 0.03] = None
+    df['pgm'] = pp.astype(str).astype(object)
+    df['horse_name'] = name_pool[horse_ids]
+    df['jockey'] = jockeys[rng.integers(0, len(jockeys), n_rows)]
+    weights = _vocab([f"{w} {e}".strip() for w in range(112, 126) for e in EQUIPMENT])
+    df['wgt_me'] = weights[rng.integers(0, len(weights), n_rows)]
+    df['pp'] = pp
+
+    margin_idx = rng.integers(0, len(MARGINS), size=n_rows)
+    if raw:
+        pos_strings = _vocab([f"{p}{m}" for p in range(MAX_FIELD + 1) for m in MARGINS])
+    for col, noise in CALL_NOISE.items():
+        pos = _positions(race_of_row, row_in_race, -ability + rng.normal(scale=noise, size=n_rows))
+        if raw:
+            # Start has no margins and the last horse's margin is blank
+            last = pos == sizes[race_of_row]
+            idx = np.where((col == 'start') | last, 0, margin_idx)
+            values = pos_strings[pos * len(MARGINS) + idx]
+        else:
+            values = pos.astype(float)
+        missing = sprint[race_of_row] if col == 'three_quarter' else rng.random(n_rows) < 0.02
+        values = values.astype(object) if raw else values
+        values[missing] = None if raw else np.nan
+        df[col] = values
+        margin_idx = np.roll(margin_idx, 1)
+
+    odds = np.round(np.exp(1.5 - 0.8 * ability + rng.normal(scale=0.5, size=n_rows)), 2)
+    df['odds'] = odds.astype(str).astype(object) if raw else odds
+    df['comments'] = _vocab(COMMENTS)[rng.integers(0, len(COMMENTS), n_rows)]
+    df['track_name'] = _vocab(TRACKS)[track_idx[race_of_row]]
+    df['date'] = date_of_race[race_of_row]
+    df['race_number'] = race_number[race_of_row]
+    if raw:
+        df['pp'] = pp.astype(str).astype(object)
+    return pd.DataFrame(df, columns=RACE_COLS)
+
+def iter_race_rows(n_rows, seed=0, raw=True, chunk_rows=1_000_000):
+    """Yield generate_race_rows chunks so 10M-row files fit in memory."""
+    first_card = 0
+    for chunk, start in enumerate(range(0, n_rows, chunk_rows)):
+        rows = generate_race_rows(min(chunk_rows, n_rows - start), seed=seed * 100_003 + chunk,
+                                  raw=raw, first_card=first_card)
+        first_card += rows.groupby(['track_name', 'date'], sort=False).ngroups
+        yield rows
+
+def write_synthetic_csv(path, n_rows, seed=0, raw=True, chunk_rows=1_000_000):
+    for i, rows in enumerate(iter_race_rows(n_rows, seed, raw, chunk_rows)):
+        rows.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    print(f"✅ Wrote {n_rows} synthetic rows to '{path}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic race-chart rows.")
+    parser.add_argument('rows', type=int, help="number of rows, e.g. 10000 to 10000000")
+    parser.add_argument('output', help="CSV file to write")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clean', action='store_true',
+                        help="emit cleaned integer positions instead of raw superscript strings")
+    args = parser.parse_args()
+
+    write_synthetic_csv(args.output, args.rows, seed=args.seed, raw=not args.clean)